@@ -0,0 +1,36 @@
+import hashlib
+
+from fastapi import Depends, Request, Response
+
+from app.database import db
+from app.versions import versions
+
+class NotModified(Exception):
+    def __init__(self, etag):
+        self.etag = etag
+
+async def not_modified_handler(request, exc):
+    return Response(status_code=304, headers={"ETag": exc.etag})
+
+def etag(*models):
+    """Router dependency tagging GET responses with the version of `models`' tables.
+
+    A matching If-None-Match answers 304 before the endpoint runs any query.
+    Reads served by a replica get no ETag: the version is the primary's, the
+    replica's rows may be older and would stay cached under it.
+    """
+    tables = [model.__tablename__ for model in models]
+
+    async def check(request: Request, response: Response):
+        if request.method != "GET":
+            return
+        current = await versions.get(tables)
+        key = f"{current}:{request.url.path}?{request.url.query}"
+        tag = '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or tag in [t.strip() for t in if_none_match.split(",")]):
+            raise NotModified(tag)
+        if not db.on_replica():
+            response.headers["ETag"] = tag
+
+    return Depends(check)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Response
+from sqlalchemy import text
+
+from app.database import db
+from app.startup import readiness
+
+router = APIRouter(tags=["health"])
+
+@router.get("/healthz", summary="Liveness, does not touch the database")
+async def healthz():
+    return {"status": "ok"}
+
+@router.get("/readyz", summary="Readiness, startup finished and the database answers")
+async def readyz(response: Response):
+    if not readiness.ready:
+        response.status_code = 503
+        return {"status": "starting"}
+    try:
+        # On the primary itself, the session would route this SELECT to a replica
+        async with db.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception:
+        response.status_code = 503
+        return {"status": "database unavailable"}
+    return {"status": "ok"}
@@ -1,84 +1,519 @@
+from collections import namedtuple
+
 from fastapi import HTTPException
-from sqlalchemy import Column, Integer, String, ForeignKey, join
+from sqlalchemy import Column, DDL, Integer, String, ForeignKey, Index, any_, bindparam, case, event, func, tuple_, text
 from sqlalchemy import update as sqlalchemy_update
 from sqlalchemy import delete as sqlalchemy_delete
 
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.future import select
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy.orm import relationship, backref, joinedload
 
+from app.cache import cache
+from app.changes import changes
+from app.config import Config
 from app.database import db, Base
+from app.loader import current_loader
+from app.readmodel import read_model
+from app.singleflight import flights
+from app.versions import versions
+from app.api.pagination import encode_cursor, decode_cursor
+
+# The trigram indexes below need the extension, migration 5c0e7d1f9b3a creates it too
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
+def trgm_index(table):
+    """GIN trigram index on `name` for `CoreModel.search`."""
+    return Index(f"ix_{table}_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"})
 
 class CoreModel:
     @classmethod
     async def create(cls, **kwargs):
-        var = cls(**kwargs)
-        db.add(var)
+        """INSERT ... ON CONFLICT DO NOTHING RETURNING, None on conflict."""
+        query = cls._insert().values(**kwargs).on_conflict_do_nothing()
+        var = await cls._write(query, kwargs)
+        if var is not None and "id" in kwargs:
+            await cls._invalidate([kwargs["id"]])
+        return var
+
+    @classmethod
+    def _insert(cls):
+        if db.get_bind().dialect.name == "postgresql":
+            return postgresql.insert(cls.__table__)
+        return sqlite.insert(cls.__table__)
+
+    @classmethod
+    async def _write(cls, query, values):
+        """Run one write statement and commit, returning the affected row or None.
+
+        SQLite has no RETURNING in SQLAlchemy 1.4, there the row is built from `values`.
+        """
+        op = "insert" if query.is_insert else "update" if query.is_update else "delete"
         try:
+            if db.get_bind().dialect.name == "postgresql":
+                query = query.returning(*cls.__table__.columns)
+                if changes.enabled:
+                    # The event is notified by the write statement itself, still one round trip
+                    query = changes.notifying(query, cls.__tablename__, op, cls._feed_context)
+                results = await db.execute(query)
+                row = results.first()
+                var = cls.record(**cls._values(row)) if row else None
+            else:
+                results = await db.execute(query)
+                var = cls.record(**values) if results.rowcount else None
+                if var is not None:
+                    await cls._publish(op, var._asdict())
             await db.commit()
         except Exception:
             await db.rollback()
             raise
+        if var is not None:
+            await versions.bump(cls.__tablename__)
         return var
 
     @classmethod
-    async def update(cls, id, **kwargs):
-        query = (
-            sqlalchemy_update(cls)
-            .where(cls.id==id)
-            .values(**kwargs)
-            .execution_options(synchronize_session="fetch")
-        )
-        await db.execute(query)
+    def _feed_context(cls, row):
+        """Extra change event fields as SQL expressions over `row`'s columns."""
+        return {}
+
+    @classmethod
+    async def _publish(cls, op, row):
+        """`changes.publish` one row, evaluating `_feed_context` with a query."""
+        if not changes.enabled:
+            return
+        context = {}
+        for name, expression in cls._feed_context(row).items():
+            context[name] = (await db.execute(select(expression))).scalar()
+        await changes.publish(cls.__tablename__, op, row=row, **context)
+
+    @classmethod
+    def record(cls, **values):
+        """Lightweight namedtuple of the table's columns, used instead of mapped instances."""
+        Record = cls.__dict__.get("_record")
+        if Record is None:
+            names = [column.key for column in cls.__table__.columns]
+            Record = namedtuple(cls.__name__ + "Record", names, defaults=(None,) * len(names))
+            cls._record = Record
+        return Record(**values)
+
+    @classmethod
+    def _select(cls, options=()):
+        """Select only the table columns, rows come back as plain tuples.
+
+        Loader `options` (eager relationships) need mapped instances, so those select the entity.
+        """
+        if options:
+            return select(cls).options(*options)
+        return select(*cls.__table__.columns)
+
+    @classmethod
+    def _rows(cls, results, options=()):
+        return results.scalars().all() if options else results.all()
+
+    @classmethod
+    def expand(cls, names):
+        """Eager load options for many-to-one relationships, loaded in the same joined query."""
+        return [joinedload(getattr(cls, name)) for name in names]
+
+    # filter name -> column, or "relationship.column" on a related table
+    __filters__ = {}
+    # columns hash-indexed by the in-memory read model, None keeps the table out of it
+    __read_indexes__ = None
+
+    @classmethod
+    def _filter_statement(cls, names, expand):
+        """Statement for one filter shape, built once and reused.
+
+        Values are bound parameters, so every call with the same shape has the
+        same SQL text and hits SQLAlchemy's compiled cache and asyncpg's
+        prepared statement cache. A related table is only joined when one of
+        its filters is used.
+        """
+        statements = cls.__dict__.get("_statements")
+        if statements is None:
+            statements = cls._statements = {}
+        query = statements.get((names, expand))
+        if query is None:
+            query = cls._select(cls.expand(expand))
+            joined = set()
+            for name in names:
+                path = cls.__filters__[name]
+                if "." in path:
+                    relation, path = path.split(".")
+                    prop = cls.__mapper__.relationships[relation]
+                    if relation not in joined:
+                        query = query.join(prop.mapper.class_, prop.primaryjoin)
+                        joined.add(relation)
+                    column = getattr(prop.mapper.class_, path)
+                else:
+                    column = getattr(cls, path)
+                query = query.where(column == bindparam(name))
+            statements[(names, expand)] = query
+        return query
+
+    @classmethod
+    async def find(cls, expand=(), **filters):
+        """Rows matching every given filter from `__filters__`, empty values are ignored."""
+        filters = {name: value for name, value in filters.items() if value}
+        rows = read_model.find(cls, filters, expand)
+        if rows is not None:
+            return rows
+        query = cls._filter_statement(tuple(sorted(filters)), tuple(expand))
+        results = await db.execute(query, filters)
+        return cls._rows(results, expand)
+
+    @classmethod
+    def _cache_key(cls, *parts):
+        return ":".join([cls.__tablename__] + [str(part) for part in parts])
+
+    @classmethod
+    def _values(cls, var):
+        return {column.key: getattr(var, column.key) for column in cls.__table__.columns}
+
+    @classmethod
+    async def _invalidate(cls, ids, cascade=False):
+        """Drop cached rows, and every row of tables whose foreign key cascades from this one."""
+        await cache.delete(*[cls._cache_key("id", id) for id in ids])
+        if cascade:
+            for mapper in Base.registry.mappers:
+                table = mapper.local_table
+                if any(fk.ondelete == "cascade" and fk.column.table is cls.__table__ for fk in table.foreign_keys):
+                    await cache.clear(table.name + ":")
+                    await versions.bump(table.name)
+
+    @classmethod
+    def _key(cls, row):
+        return tuple(row[key.key] for key in cls.__mapper__.primary_key)
+
+    @classmethod
+    async def _existing_keys(cls, keys):
+        columns = cls.__mapper__.primary_key
+        if len(columns) == 1:
+            query = select(*columns).where(columns[0].in_([key[0] for key in keys]))
+        else:
+            query = select(*columns).where(tuple_(*columns).in_(keys))
+        results = await db.execute(query)
+        return set(tuple(row) for row in results)
+
+    @classmethod
+    async def _missing_parents(cls, rows):
+        """Indexes of rows referencing a parent that does not exist, one query per foreign key."""
+        missing = set()
+        for column in cls.__table__.columns:
+            for fk in column.foreign_keys:
+                values = set(row[column.key] for row in rows if row.get(column.key) is not None)
+                if not values:
+                    continue
+                results = await db.execute(select(fk.column).where(fk.column.in_(values)))
+                found = set(results.scalars().all())
+                missing.update(
+                    i for i, row in enumerate(rows)
+                    if row.get(column.key) is not None and row[column.key] not in found
+                )
+        return missing
+
+    @classmethod
+    async def bulk_create(cls, rows, upsert=False):
+        """Multi-row INSERT ... ON CONFLICT, one transaction per BULK_BATCH_SIZE rows.
+
+        Returns one status per row: "created", "updated", "conflict", "fk_missing",
+        or "error" for a row that violated another constraint.
+        """
+        statuses = []
+        for start in range(0, len(rows), Config.BULK_BATCH_SIZE):
+            statuses.extend(await cls._bulk_batch(rows[start:start + Config.BULK_BATCH_SIZE], upsert))
+        return statuses
+
+    @classmethod
+    async def _bulk_batch(cls, rows, upsert):
+        statuses = [None] * len(rows)
+        for i in await cls._missing_parents(rows):
+            statuses[i] = "fk_missing"
+        unique = {}
+        for i, row in enumerate(rows):
+            if statuses[i] is None:
+                if cls._key(row) in unique:
+                    statuses[i] = "conflict"
+                else:
+                    unique[cls._key(row)] = i
+        if not unique:
+            return statuses
+
         try:
-            await db.commit()
-        except Exception:
+            written, existing = await cls._bulk_write(rows, unique, upsert)
+        except IntegrityError:
+            # Another constraint, e.g. a unique name, failed for some row. Earlier batches
+            # are committed already: retry this one row by row, only the bad rows fail.
             await db.rollback()
-            raise
-        return await cls.get(id)
+            written, existing = set(), set()
+            for key, i in unique.items():
+                try:
+                    row_written, row_existing = await cls._bulk_write(rows, {key: i}, upsert)
+                except IntegrityError:
+                    await db.rollback()
+                    statuses[i] = "error"
+                    continue
+                written |= row_written
+                existing |= row_existing
+
+        if written:
+            await versions.bump(cls.__tablename__)
+        if upsert and "id" in [key.key for key in cls.__mapper__.primary_key]:
+            await cls._invalidate([key[0] for key in written])
+
+        for key, i in unique.items():
+            if statuses[i] is not None:
+                continue
+            if key not in written:
+                statuses[i] = "conflict"
+            elif key in existing:
+                statuses[i] = "updated"
+            else:
+                statuses[i] = "created"
+        return statuses
+
+    @classmethod
+    async def _bulk_write(cls, rows, unique, upsert):
+        """One multi-row INSERT of `rows[i]` for every `unique` key -> i, committed.
+
+        Returns (written keys, keys that existed before).
+        """
+        columns = [key.key for key in cls.__mapper__.primary_key]
+        others = [c.key for c in cls.__table__.columns if c.key not in columns]
+        query = cls._insert().values([rows[i] for i in unique.values()])
+        if upsert and others:
+            query = query.on_conflict_do_update(
+                index_elements=columns,
+                set_={key: query.excluded[key] for key in others},
+            )
+        else:
+            query = query.on_conflict_do_nothing()
+
+        keys = list(unique)
+        if db.get_bind().dialect.name == "postgresql":
+            existing = await cls._existing_keys(keys) if upsert else set()
+            if changes.enabled:
+                # Every written row goes out with its own event, in the same round trip
+                query = changes.notifying(
+                    query.returning(*cls.__table__.columns), cls.__tablename__, "bulk", cls._feed_context
+                )
+            else:
+                query = query.returning(*cls.__mapper__.primary_key)
+            results = await db.execute(query)
+            written = set(cls._key(row._mapping) for row in results)
+        else:
+            # SQLite has no RETURNING here, compare the keys around the insert instead
+            existing = await cls._existing_keys(keys)
+            await db.execute(query)
+            written = await cls._existing_keys(keys)
+            if not upsert:
+                written -= existing
+            # Upserts set every column, so the stored rows are the given ones
+            for key, i in unique.items():
+                if key in written:
+                    await cls._publish("bulk", rows[i])
+        await db.commit()
+        return written, existing
+
+    @classmethod
+    async def update(cls, id, **kwargs):
+        """UPDATE ... RETURNING, None when no row has this id."""
+        query = sqlalchemy_update(cls.__table__).where(cls.id==id).values(**kwargs)
+        var = await cls._write(query, dict(kwargs, id=id))
+        await cls._invalidate([id])
+        return var
 
     @classmethod
     async def get_all(cls):
-        query = select(cls)
+        query = cls._select()
+        results = await db.execute(query)
+        return results.all()
+
+    @classmethod
+    def _page_query(cls, query, limit, after):
+        keys = cls.__mapper__.primary_key
+        query = query.order_by(*keys).limit(limit + 1)
+        values = decode_cursor(after, keys)
+        if values is not None:
+            if len(keys) == 1:
+                query = query.where(keys[0] > values[0])
+            else:
+                query = query.where(tuple_(*keys) > tuple_(*values))
+        return query
+
+    @classmethod
+    def _next_page(cls, rows, limit, key):
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(key(rows[-1], column.key) for column in cls.__mapper__.primary_key)
+
+    @classmethod
+    async def get_page(cls, limit, after=None, options=()):
+        """Keyset page ordered by primary key, returns (rows, next cursor)."""
+        query = cls._page_query(cls._select(options), limit, after)
+        results = await db.execute(query)
+        return cls._next_page(cls._rows(results, options), limit, getattr)
+
+    @classmethod
+    async def get_page_rows(cls, limit, after=None):
+        """Same page as `get_page` but as plain dicts from a Core select, no ORM instances."""
+        query = cls._page_query(select(*cls.__table__.columns), limit, after)
         results = await db.execute(query)
-        return results.scalars().all()
+        keys = list(results.keys())
+        rows = [dict(zip(keys, row)) for row in results.all()]
+        return cls._next_page(rows, limit, dict.get)
+
+    @classmethod
+    async def stream_all(cls, chunk_size):
+        """Yield chunks of plain rows from a server-side cursor."""
+        query = (
+            select(*cls.__table__.columns)
+            .order_by(*cls.__mapper__.primary_key)
+            .execution_options(yield_per=chunk_size)
+        )
+        results = await db.stream(query)
+        async for partition in results.partitions(chunk_size):
+            yield partition
 
     @classmethod
     async def get(cls, id):
-        query = select(cls).where(cls.id==id)
+        if read_model.serves(cls):
+            return read_model.get(cls, id)
+        key = cls._cache_key("id", id)
+        values = None if db.reads_own_writes() else await cache.get(key)
+        if values is not None:
+            return cls.record(**values)
+        loader = current_loader()
+        if loader is not None:
+            return await loader.load(cls, id)
+        return await cls._coalesce((cls.__tablename__, "id", id), cls._get, id)
+
+    @classmethod
+    async def get_many(cls, ids):
+        """Rows by id as a dict, cached ones are not fetched again."""
+        ids = list(dict.fromkeys(ids))
+        if read_model.serves(cls):
+            return {id: row for id, row in ((id, read_model.get(cls, id)) for id in ids) if row is not None}
+        if db.reads_own_writes():
+            values = [None] * len(ids)
+        else:
+            values = await cache.get_many([cls._cache_key("id", id) for id in ids])
+        found = {id: cls.record(**value) for id, value in zip(ids, values) if value is not None}
+        missing = [id for id in ids if id not in found]
+        if missing:
+            found.update(await cls._fetch_many(missing))
+        return found
+
+    @classmethod
+    async def _fetch_many(cls, ids):
+        return await cls._coalesce((cls.__tablename__, "ids", tuple(sorted(ids))), cls._get_many, ids)
+
+    @classmethod
+    async def _fill_cache(cls, version, items):
+        """`cache.set` every (key, value) unless the table was written since `version` was read.
+
+        A read racing a write could otherwise cache its row after the
+        writer's invalidation, and keep serving it for CACHE_TTL. Rows read
+        from a replica are never cached, they may predate a write already
+        invalidated.
+        """
+        if db.on_replica() or await versions.get([cls.__tablename__]) != version:
+            return
+        for key, value in items:
+            await cache.set(key, value)
+
+    @classmethod
+    async def _get_many(cls, ids):
+        version = await versions.get([cls.__tablename__])
+        if db.get_bind().dialect.name == "postgresql":
+            # One array parameter, so the statement is the same for any number of ids
+            query = cls._select().where(cls.id == any_(bindparam("ids", ids, type_=postgresql.ARRAY(Integer))))
+        else:
+            query = cls._select().where(cls.id.in_(ids))
+        results = await db.execute(query)
+        _result = {var.id: var for var in results.all()}
+        await cls._fill_cache(version, [(cls._cache_key("id", id), cls._values(var)) for id, var in _result.items()])
+        return _result
+
+    @classmethod
+    async def _get(cls, id):
+        version = await versions.get([cls.__tablename__])
+        query = cls._select().where(cls.id==id)
         results = await db.execute(query)
-        _result = results.scalar()
+        _result = results.first()
+        if _result is not None:
+            await cls._fill_cache(version, [(cls._cache_key("id", id), cls._values(_result))])
         #print(_result)
         """ if _result is None:
             name_cls = str(cls)
             raise HTTPException(status_code=404, detail=f"{name_cls[15:(len(name_cls)-2)]} not found") """
         return _result
 
+    @classmethod
+    async def _coalesce(cls, key, fn, *args):
+        """Share one query between concurrent identical reads, in its own session.
+
+        Replica and primary reads never share, a client reading its own
+        writes must not get a replica's answer.
+        """
+        key = key + (db.on_replica(),)
+        async def run():
+            async with db.scope():
+                return await fn(*args)
+        return await flights.do(key, run)
+
     @classmethod
     async def delete(cls, id):
-        query = sqlalchemy_delete(cls).where(cls.id==id)
-        await db.execute(query)
-        try:
-            await db.commit()
-        except Exception:
-            await db.rollback()
-            raise
-        return True
+        """DELETE ... RETURNING, False when no row has this id."""
+        query = sqlalchemy_delete(cls.__table__).where(cls.id==id)
+        deleted = await cls._write(query, {"id": id}) is not None
+        await cls._invalidate([id], cascade=deleted)
+        return deleted
 
     @classmethod
     async def filter_by_name(cls, name):
-        query = select(cls).where(cls.name==name)
+        if read_model.serves(cls):
+            return read_model.where(cls, "name", name)
+        query = cls._select().where(cls.name==name)
         results = await db.execute(query)
-        _result = results.scalars().all()
+        _result = results.all()
         """ if _result == []:
             name_cls = str(cls)
             raise HTTPException(status_code=404, detail=f"{name_cls[15:(len(name_cls)-2)]} not found") """
         return _result
 
+    @classmethod
+    async def search(cls, q, limit):
+        """Partial and fuzzy name matches, best first.
+
+        PostgreSQL ranks ILIKE and trigram (`%`) matches by similarity using the
+        pg_trgm GIN index, other databases fall back to LIKE with prefixes first.
+        """
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        if db.get_bind().dialect.name == "postgresql":
+            query = (
+                cls._select()
+                .where(cls.name.ilike(pattern, escape="\\") | cls.name.op("%")(q))
+                .order_by(func.similarity(cls.name, q).desc(), cls.name)
+            )
+        else:
+            query = (
+                cls._select()
+                .where(cls.name.like(pattern, escape="\\"))
+                .order_by(case((cls.name.like(pattern[1:], escape="\\"), 0), else_=1), cls.name)
+            )
+        results = await db.execute(query.limit(limit))
+        return results.all()
+
 
 class Fleet(Base, CoreModel):
     __tablename__ = "fleets"
+    __table_args__ = (trgm_index("fleets"),)
+    __read_indexes__ = ("name",)
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, unique=True)
     #vehicles = relationship("Vehicle", cascade="delete-orphan", backref="vehicles")
     #vehicle = relationship("Vehicle", back_populates="owner", cascade="delete", passive_deletes=True)
@@ -87,40 +522,51 @@ class Fleet(Base, CoreModel):
 
     @classmethod
     async def get_by_name(cls, name):
-        query = select(cls).where(cls.name==name)
+        if read_model.serves(cls):
+            return next(iter(read_model.where(cls, "name", name)), None)
+        # Only the id is cached by name, a renamed or deleted fleet fails the check below
+        key = cls._cache_key("name", name)
+        id = None if db.reads_own_writes() else await cache.get(key)
+        if id is not None:
+            fleet = await cls.get(id)
+            if fleet is not None and fleet.name == name:
+                return fleet
+            await cache.delete(key)
+        version = await versions.get([cls.__tablename__])
+        query = cls._select().where(cls.name==name)
         results = await db.execute(query)
-        _result = results.scalar()
+        _result = results.first()
+        if _result is not None:
+            await cls._fill_cache(version, [(key, _result.id), (cls._cache_key("id", _result.id), cls._values(_result))])
         return _result
 
 class Vehicle(Base, CoreModel):
     __tablename__ = "vehicles"
 
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String, index=True)
     owner_id = Column(Integer, ForeignKey("fleets.id", ondelete="cascade"))
     #owner = relationship("Fleet", backref=backref("fleets", cascade="delete"))
     #owner = relationship("Fleet", back_populates="vehicle")
     __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (Index("ix_vehicles_owner_id_name", "owner_id", "name"), trgm_index("vehicles"))
+    __filters__ = {"owner_id": "owner_id", "name": "name"}
+    __read_indexes__ = ("name", "owner_id")
 
     #route_detail = relationship("RouteDetail", back_populates="vehicle", cascade="delete-orphan")
     route_detail = relationship("RouteDetail", cascade = "delete", passive_deletes=True)
 
     @classmethod
     async def filter_both(cls,id, name):
-        query = select(cls)
-        if id:
-            query = query.filter(cls.owner_id==id)
-        if name:
-            query = query.filter(cls.name==name)
-
-        results = await db.execute(query)
-        return results.scalars().all()
+        return await cls.find(owner_id=id, name=name)
 
 class Driver(Base, CoreModel):
     __tablename__ = "drivers"
+    __table_args__ = (trgm_index("drivers"),)
+    __read_indexes__ = ("name",)
 
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String, index=True)
     #route_detail = relationship("RouteDetail", back_populates="driver", cascade="all, delete-orphan")
     route_detail = relationship("RouteDetail", cascade = "delete", passive_deletes=True)
 
@@ -136,9 +582,11 @@ class Driver(Base, CoreModel):
 
 class Route(Base, CoreModel):
     __tablename__ = "routes"
+    __table_args__ = (trgm_index("routes"),)
+    __read_indexes__ = ("name",)
 
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String, index=True)
     #route_detail = relationship("RouteDetail", back_populates="route", cascade="all, delete-orphan")
     route_detail = relationship("RouteDetail", cascade = "delete", passive_deletes=True)
 
@@ -156,93 +604,127 @@ class RouteDetail(Base, CoreModel):
     __tablename__ = "routedetail"
 
     route_id = Column(Integer, ForeignKey("routes.id"), primary_key=True)
-    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True)
-    driver_id = Column(Integer, ForeignKey("drivers.id"))
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True, index=True)
+    driver_id = Column(Integer, ForeignKey("drivers.id"), index=True)
 
     route = relationship("Route", back_populates="route_detail")
     vehicle = relationship("Vehicle", back_populates="route_detail")
     driver = relationship("Driver", back_populates="route_detail")
 
+    __filters__ = {
+        "route_name": "route.name",
+        "vehicle_name": "vehicle.name",
+        "driver_name": "driver.name",
+    }
+    __read_indexes__ = ("route_id", "vehicle_id", "driver_id")
+
+    @classmethod
+    def _feed_context(cls, row):
+        # No fleet column here, `fleet=` subscribers match on the vehicle's owner
+        return {"fleet": select(Vehicle.owner_id).where(Vehicle.id == row["vehicle_id"]).scalar_subquery()}
+
     @classmethod
-    async def get_id(cls, id):
-        query = select(cls).where(cls.route_id==id)
+    async def get_id(cls, id, expand=()):
+        if read_model.serves(cls, *(cls.__mapper__.relationships[name].mapper.class_ for name in expand)):
+            return read_model.expand(cls, read_model.where(cls, "route_id", id), expand)
+        options = cls.expand(expand)
+        query = cls._select(options).where(cls.route_id==id)
         results = await db.execute(query)
-        _result = results.scalars().all()
+        _result = cls._rows(results, options)
         return _result
     
     @classmethod
     async def get_driver_id(cls, id):
-        query = select(cls).where(cls.driver_id==id)
+        query = cls._select().where(cls.driver_id==id)
         results = await db.execute(query)
-        _result = results.scalars().all()
+        _result = results.all()
         """ if _result == []:
             raise HTTPException(status_code=404, detail="Route not found") """
         return _result
     
     @classmethod
     async def get_vehicle_id(cls, id):
-        query = select(cls).where(cls.vehicle_id==id)
+        query = cls._select().where(cls.vehicle_id==id)
         results = await db.execute(query)
-        _result = results.scalars().all()
+        _result = results.all()
         """ if _result == []:
             raise HTTPException(status_code=404, detail="Route not found") """
         return _result
 
     @classmethod
-    async def join_route(cls, route_name,vehicle_name, driver_name):
-        if not (route_name or driver_name or vehicle_name):
-            return []
-
-        _join = join(cls, Route, cls.route_id==Route.id).join(Vehicle, cls.vehicle_id==Vehicle.id).join(Driver, cls.driver_id==Driver.id)
-        
-        if route_name:
-            if vehicle_name:
-                if driver_name:
-                    query = select(cls).select_from(_join).where(Route.name==route_name,Vehicle.name==vehicle_name, Driver.name==driver_name)
-                else:
-                    query = select(cls).select_from(_join).where(Route.name==route_name,Vehicle.name==vehicle_name)
-            else:
-                if driver_name:
-                    query = select(cls).select_from(_join).where(Route.name==route_name,Driver.name==driver_name)
-                else:
-                    query = select(cls).select_from(_join).where(Route.name==route_name)
-        elif vehicle_name:
-            if driver_name:
-                query = select(cls).select_from(_join).where(Driver.name==driver_name,Vehicle.name==vehicle_name)
-            else:
-                query = select(cls).select_from(_join).where(Vehicle.name==vehicle_name)
-        else:
-            query = select(cls).select_from(_join).where(Driver.name==driver_name)
-
-        results = await db.execute(query)
-        print(results)
-        return results.scalars().all()
+    async def get_by_name(cls, route_name, vehicle_name, driver_name, expand=()):
+        filters = dict(route_name=route_name, vehicle_name=vehicle_name, driver_name=driver_name)
+        rows = read_model.find(cls, {name: value for name, value in filters.items() if value}, expand)
+        if rows is not None:
+            return rows
+        key = (cls.__tablename__, "name", route_name, vehicle_name, driver_name, tuple(expand))
+        return await cls._coalesce(key, cls._get_by_name, route_name, vehicle_name, driver_name, expand)
 
     @classmethod
-    async def get_by_name(cls, route_name, vehicle_name, driver_name):
-
-        _join = join(cls, Route, cls.route_id==Route.id
-        ).join(Vehicle, cls.vehicle_id==Vehicle.id
-        ).join(Driver, cls.driver_id==Driver.id)
-    
-        query = select(cls).select_from(_join)        
-        if route_name:
-            query = query.filter(Route.name==route_name)
-        if vehicle_name:
-            query = query.filter(Vehicle.name==vehicle_name)
-        if driver_name:
-            query = query.filter(Driver.name==driver_name)
+    async def _get_by_name(cls, route_name, vehicle_name, driver_name, expand=()):
+        return await cls.find(expand, route_name=route_name, vehicle_name=vehicle_name, driver_name=driver_name)
 
-        results = await db.execute(query)
-        return results.scalars().all()
-        
     @classmethod
     async def delete_id(cls,route_id, vehicle_id, driver_id):
-        query = sqlalchemy_delete(cls).where(cls.route_id==route_id, cls.vehicle_id==vehicle_id, cls.driver_id==driver_id)
-        await db.execute(query)
+        values = dict(route_id=route_id, vehicle_id=vehicle_id, driver_id=driver_id)
+        query = sqlalchemy_delete(cls.__table__).where(cls.route_id==route_id, cls.vehicle_id==vehicle_id, cls.driver_id==driver_id)
+        return await cls._write(query, values) is not None
+
+    @classmethod
+    async def copy_records(cls, records):
+        """COPY records into a staging table, validate foreign keys and merge.
+
+        Rows with a missing route, vehicle or driver are counted and skipped.
+        `records` may be an async iterable, so the input is never held in memory.
+        """
+        conn = await db.connection()
+        if conn.dialect.name != "postgresql":
+            raise HTTPException(status_code=501, detail="Import requires PostgreSQL")
         try:
+            await conn.execute(text(
+                "CREATE TEMP TABLE routedetail_import "
+                "(route_id integer, vehicle_id integer, driver_id integer) ON COMMIT DROP"
+            ))
+            raw = await conn.get_raw_connection()
+            status = await raw.driver_connection.copy_records_to_table(
+                "routedetail_import", records=records,
+                columns=["route_id", "vehicle_id", "driver_id"],
+            )
+            result = await conn.execute(text("""
+                SELECT
+                    count(*) FILTER (WHERE r.id IS NULL),
+                    count(*) FILTER (WHERE v.id IS NULL),
+                    count(*) FILTER (WHERE i.driver_id IS NOT NULL AND d.id IS NULL)
+                FROM routedetail_import i
+                LEFT JOIN routes r ON r.id = i.route_id
+                LEFT JOIN vehicles v ON v.id = i.vehicle_id
+                LEFT JOIN drivers d ON d.id = i.driver_id
+            """))
+            missing_route, missing_vehicle, missing_driver = result.one()
+            result = await conn.execute(text("""
+                INSERT INTO routedetail (route_id, vehicle_id, driver_id)
+                SELECT DISTINCT ON (i.route_id, i.vehicle_id) i.route_id, i.vehicle_id, i.driver_id
+                FROM routedetail_import i
+                JOIN routes r ON r.id = i.route_id
+                JOIN vehicles v ON v.id = i.vehicle_id
+                LEFT JOIN drivers d ON d.id = i.driver_id
+                WHERE i.driver_id IS NULL OR d.id IS NOT NULL
+                ON CONFLICT (route_id, vehicle_id) DO UPDATE SET driver_id = EXCLUDED.driver_id
+            """))
+            merged = result.rowcount
+            if merged:
+                await changes.publish(cls.__tablename__, "bulk", count=merged)
             await db.commit()
         except Exception:
             await db.rollback()
             raise
-        return True
\ No newline at end of file
+        if merged:
+            await versions.bump(cls.__tablename__)
+            await cache.clear(cls.__tablename__ + ":")
+        return {
+            "copied": int(status.split()[-1]),
+            "merged": merged,
+            "missing_route": missing_route,
+            "missing_vehicle": missing_vehicle,
+            "missing_driver": missing_driver,
+        }
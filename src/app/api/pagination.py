@@ -0,0 +1,26 @@
+import base64
+import json
+
+from fastapi import HTTPException
+
+def encode_cursor(values):
+    """Opaque cursor for the primary key values of the last row of a page."""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, columns):
+    """Key values of a cursor, checked against the types of the key `columns`."""
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    for value, column in zip(values, columns):
+        # bool is an int too, but never a key value
+        if isinstance(value, bool) or not isinstance(value, column.type.python_type):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
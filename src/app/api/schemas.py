@@ -1,5 +1,16 @@
-#from typing import Optional
+from typing import Generic, List, Optional, TypeVar
 from pydantic import BaseModel
+from pydantic.generics import GenericModel
+
+T = TypeVar("T")
+
+class Page(GenericModel, Generic[T]):
+    items: List[T]
+    next: Optional[str] = None
+
+class BulkResult(BaseModel):
+    index: int
+    status: str
 
 class FleetBase(BaseModel):
     name: str
@@ -46,3 +57,7 @@ class RouteDetail(BaseModel):
     class Config:
         orm_mode = True
 
+class RouteDetailExpanded(RouteDetail):
+    route: Optional[Route] = None
+    vehicle: Optional[Vehicle] = None
+    driver: Optional[Driver] = None
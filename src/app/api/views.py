@@ -1,11 +1,61 @@
-from fastapi import APIRouter, HTTPException, Path
+import asyncio
+import csv
+import io
+import json
+
+from fastapi import APIRouter, HTTPException, Path, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from app.api.etag import etag
 from app.api.models import Fleet, Driver, RouteDetail, Vehicle, Route
+from app.cache import cache
+from app.changes import Subscription, changes
+from app.config import Config
+from app.importer import import_routedetails
+from app.metrics import exposition
+from app.slowlog import slow_queries
+from app.timing import timings
 from typing import List, Optional
 import app.api.schemas as schemas
 
+PAGE_LIMIT = Query(100, gt=0, le=1000)
+SEARCH_LIMIT = Query(20, gt=0, le=100)
+IDS = Query(None, regex=r"^\d+(,\d+)*$", description="Comma separated ids, replaces paging")
+
+EXPAND = Query(None, regex=r"^(route|vehicle|driver)(,(route|vehicle|driver))*$", description="Related rows to embed")
+
+def parse_expand(expand):
+    return sorted(set(expand.split(","))) if expand else []
+
+def expand_details(routedetails, expand):
+    """Plain dicts so only the relationships that were eagerly loaded get serialized."""
+    return [
+        dict(
+            route_id=detail.route_id, vehicle_id=detail.vehicle_id, driver_id=detail.driver_id,
+            **{name: getattr(detail, name) for name in expand}
+        )
+        for detail in routedetails
+    ]
+
+async def fast_page(model, limit, after, response):
+    """Config.FAST_JSON: Core rows encoded by orjson, skipping ORM loading and response_model validation."""
+    rows, _next = await model.get_page_rows(limit, after)
+    return ORJSONResponse({"items": rows, "next": _next}, headers=dict(response.headers))
+
+async def get_by_ids(model, ids):
+    ids = [int(id) for id in ids.split(",")]
+    if len(ids) > 1000:
+        raise HTTPException(status_code=422, detail="At most 1000 ids")
+    found = await model.get_many(ids)
+    return {"items": [found[id] for id in dict.fromkeys(ids) if id in found], "next": None}
+
+async def bulk_create(model, items, upsert):
+    statuses = await model.bulk_create([item.dict() for item in items], upsert)
+    return [{"index": i, "status": status} for i, status in enumerate(statuses)]
+
 '''Fleet'''
 
-api_fleet = APIRouter(prefix="/fleet", tags=["fleet"])
+api_fleet = APIRouter(prefix="/fleet", tags=["fleet"], dependencies=[etag(Fleet)])
 
 @api_fleet.get("/", response_model=schemas.Fleet, summary="Get a fleet by name")
 async def get_fleet_by_name(name: str):
@@ -25,45 +75,50 @@ async def get_fleet(id:int = Path(..., gt=0)):
 @api_fleet.post("/",response_model=schemas.Fleet, status_code=201, summary="Create a fleet")
 async def create_fleet(fleet: schemas.Fleet):
     _dict = fleet.dict()
-    fleet_name = await Fleet.get_by_name(_dict["name"])
-    fleet_id = await Fleet.get(_dict["id"])
-    if fleet_name:
-        raise HTTPException(status_code=409, detail=f"Fleet {_dict['name']} exists")
-    if fleet_id:
-        raise HTTPException(status_code=409, detail=f"Fleet {_dict['id']} exists")
     fleet = await Fleet.create(**_dict)
+    if fleet is None:
+        raise HTTPException(status_code=409, detail=f"Fleet {_dict['id']} or {_dict['name']} exists")
     #return schemas.Fleet.from_orm(fleet)
     return fleet
 
+@api_fleet.post("/bulk", response_model=List[schemas.BulkResult], summary="Create or upsert fleets in bulk")
+async def create_fleets_bulk(fleets: List[schemas.Fleet], upsert: bool = False):
+    return await bulk_create(Fleet, fleets, upsert)
+
 @api_fleet.put("/{id}", response_model=schemas.Fleet, summary="Update a fleet")
 async def update_fleet(fleet: schemas.FleetBase, id:int = Path(..., gt=0),):
-    _fleet = await Fleet.get(id)
-    if _fleet is None:
-        raise HTTPException(status_code=404, detail="Fleet not found")
     _dict = fleet.dict()
-    fleet_name = await Fleet.get_by_name(_dict['name'])
-    if fleet_name:
+    try:
+        fleet = await Fleet.update(id, **_dict)
+    except IntegrityError:
         raise HTTPException(status_code=409, detail=f"Fleet {_dict['name']} exists")
-    fleet = await Fleet.update(id, **_dict)
+    if fleet is None:
+        raise HTTPException(status_code=404, detail="Fleet not found")
     return schemas.Fleet.from_orm(fleet)
 
 @api_fleet.delete("/{id}", summary="Delete a fleet")
 async def delete_fleet(id:int = Path(..., gt=0)):
-    fleet = await Fleet.get(id)
-    if fleet is None:
+    if not await Fleet.delete(id):
         raise HTTPException(status_code=404, detail="Fleet not found")
-    await Fleet.delete(id)
     return {"detail": "Delete succesfully"}
 
-api_fleets = APIRouter(prefix="/fleets", tags=["fleet"])
-@api_fleets.get("/",response_model=List[schemas.Fleet],summary="Get all fleets")
-async def get_fleets():
-    fleet = await Fleet.get_all()
-    return fleet
+api_fleets = APIRouter(prefix="/fleets", tags=["fleet"], dependencies=[etag(Fleet)])
+@api_fleets.get("/search", response_model=List[schemas.Fleet], summary="Search fleets by partial name")
+async def search_fleets(q: str = Query(..., min_length=1), limit: int = SEARCH_LIMIT):
+    return await Fleet.search(q, limit)
+
+@api_fleets.get("/",response_model=schemas.Page[schemas.Fleet],summary="Get all fleets")
+async def get_fleets(response: Response, limit: int = PAGE_LIMIT, after: Optional[str] = None, ids: Optional[str] = IDS):
+    if ids:
+        return await get_by_ids(Fleet, ids)
+    if Config.FAST_JSON:
+        return await fast_page(Fleet, limit, after, response)
+    fleet, _next = await Fleet.get_page(limit, after)
+    return {"items": fleet, "next": _next}
 
 '''Vehicle'''
 
-api_vehicle = APIRouter(prefix="/vehicle", tags=["vehicle"])
+api_vehicle = APIRouter(prefix="/vehicle", tags=["vehicle"], dependencies=[etag(Vehicle)])
 
 
 @api_vehicle.get("/", response_model=List[schemas.Vehicle], summary="Get vehicles by name or by fleet's id")
@@ -87,51 +142,65 @@ async def get_vehicle_id(id:int = Path(..., gt=0)):
 @api_vehicle.post("/",response_model=schemas.Vehicle,status_code=201, summary="Create a vehicle")
 async def create_vehicle(vehicle: schemas.Vehicle):
     _dict = vehicle.dict()
-    result = await Fleet.get(_dict['owner_id'])
-    if result is None:
+    try:
+        vehicle = await Vehicle.create(**_dict)
+    except IntegrityError:
         raise HTTPException(status_code=404, detail=f"Fleet not found")
-    _id = await Vehicle.get(_dict["id"])
-    if _id:
-        raise HTTPException(status_code=409, detail=f"Vehicle {_dict['id']} exists")    
-    vehicle = await Vehicle.create(**_dict)
+    if vehicle is None:
+        raise HTTPException(status_code=409, detail=f"Vehicle {_dict['id']} exists")
     return vehicle
 
+@api_vehicle.post("/bulk", response_model=List[schemas.BulkResult], summary="Create or upsert vehicles in bulk")
+async def create_vehicles_bulk(vehicles: List[schemas.Vehicle], upsert: bool = False):
+    return await bulk_create(Vehicle, vehicles, upsert)
+
 @api_vehicle.put("/{id}", response_model=schemas.Vehicle, summary="Update a vehicle")
 async def update_vehicle(vehicle: schemas.VehicleBase, id:int = Path(..., gt=0),):
-    _vehicle = await Vehicle.get(id)
-    if _vehicle is None:
+    try:
+        vehicle = await Vehicle.update(id, **vehicle.dict())
+    except IntegrityError:
+        raise HTTPException(status_code=404, detail=f"Fleet not found")
+    if vehicle is None:
         raise HTTPException(status_code=404, detail="Vehicle not found")
-    vehicle = await Vehicle.update(id, **vehicle.dict())
     return schemas.Vehicle.from_orm(vehicle)
 
 @api_vehicle.delete("/{id}", summary="Delete a vehicle")
 async def delete_vehicle(id:int = Path(..., gt=0)):
-    vehicle = await Vehicle.get(id)
-    if vehicle is None:
+    if not await Vehicle.delete(id):
         raise HTTPException(status_code=404, detail="Vehicle not found")
-    await Vehicle.delete(id)
     return {"detail": "Delete succesfully"}
 
-api_vehicles = APIRouter(prefix="/vehicles", tags=["vehicle"])
+api_vehicles = APIRouter(prefix="/vehicles", tags=["vehicle"], dependencies=[etag(Vehicle)])
 
-@api_vehicles.get("/",response_model=List[schemas.Vehicle],summary="Get all vehicles")
-async def get_vehicles():
-    vehicle = await Vehicle.get_all()
-    return vehicle
+@api_vehicles.get("/search", response_model=List[schemas.Vehicle], summary="Search vehicles by partial name")
+async def search_vehicles(q: str = Query(..., min_length=1), limit: int = SEARCH_LIMIT):
+    return await Vehicle.search(q, limit)
+
+@api_vehicles.get("/",response_model=schemas.Page[schemas.Vehicle],summary="Get all vehicles")
+async def get_vehicles(response: Response, limit: int = PAGE_LIMIT, after: Optional[str] = None, ids: Optional[str] = IDS):
+    if ids:
+        return await get_by_ids(Vehicle, ids)
+    if Config.FAST_JSON:
+        return await fast_page(Vehicle, limit, after, response)
+    vehicle, _next = await Vehicle.get_page(limit, after)
+    return {"items": vehicle, "next": _next}
 
 '''Driver'''
 
-api_driver = APIRouter(prefix="/driver", tags=["driver"])
+api_driver = APIRouter(prefix="/driver", tags=["driver"], dependencies=[etag(Driver)])
 
 @api_driver.post("/",response_model=schemas.Driver, status_code=201, summary="Create a driver")
 async def create_driver(driver: schemas.Driver):
     _dict = driver.dict()
-    _id = await Driver.get(_dict["id"])
-    if _id:
-        raise HTTPException(status_code=409, detail=f"Driver {_dict['id']} exists")    
     driver = await Driver.create(**_dict)
+    if driver is None:
+        raise HTTPException(status_code=409, detail=f"Driver {_dict['id']} exists")
     return driver
 
+@api_driver.post("/bulk", response_model=List[schemas.BulkResult], summary="Create or upsert drivers in bulk")
+async def create_drivers_bulk(drivers: List[schemas.Driver], upsert: bool = False):
+    return await bulk_create(Driver, drivers, upsert)
+
 @api_driver.get("/", response_model=List[schemas.Driver], summary="Get drivers by name")
 async def get_driver_by_name(name: str):
     driver = await Driver.filter_by_name(name)
@@ -148,39 +217,47 @@ async def get_driver(id:int = Path(..., gt=0)):
 
 @api_driver.put("/{id}", response_model=schemas.Driver, summary="Update a driver")
 async def update_driver(driver: schemas.DriverBase, id:int = Path(..., gt=0),):
-    _driver = await Driver.get(id)
-    if _driver is None:
-        raise HTTPException(status_code=404, detail="Driver not found")
     driver = await Driver.update(id, **driver.dict())
+    if driver is None:
+        raise HTTPException(status_code=404, detail="Driver not found")
     return schemas.Driver.from_orm(driver)
 
 @api_driver.delete("/{id}", summary="Delete a driver")
 async def delete_driver(id:int = Path(..., gt=0)):
-    driver = await Driver.get(id)
-    if driver is None:
+    if not await Driver.delete(id):
         raise HTTPException(status_code=404, detail="Driver not found")
-    await Driver.delete(id)
     return {"detail": "Delete succesfully"}
 
-api_drivers = APIRouter(prefix="/drivers", tags=["driver"])
-@api_drivers.get("/", response_model=List[schemas.Driver], summary="Get all drivers")
-async def get_drivers():
-    driver = await Driver.get_all()
-    return driver
+api_drivers = APIRouter(prefix="/drivers", tags=["driver"], dependencies=[etag(Driver)])
+@api_drivers.get("/search", response_model=List[schemas.Driver], summary="Search drivers by partial name")
+async def search_drivers(q: str = Query(..., min_length=1), limit: int = SEARCH_LIMIT):
+    return await Driver.search(q, limit)
+
+@api_drivers.get("/", response_model=schemas.Page[schemas.Driver],summary="Get all drivers")
+async def get_drivers(response: Response, limit: int = PAGE_LIMIT, after: Optional[str] = None, ids: Optional[str] = IDS):
+    if ids:
+        return await get_by_ids(Driver, ids)
+    if Config.FAST_JSON:
+        return await fast_page(Driver, limit, after, response)
+    driver, _next = await Driver.get_page(limit, after)
+    return {"items": driver, "next": _next}
 
 '''Route'''
 
-api_route = APIRouter(prefix="/route", tags=["route"])
+api_route = APIRouter(prefix="/route", tags=["route"], dependencies=[etag(Route)])
 
 @api_route.post("/",response_model=schemas.Route, status_code=201, summary="Create a route")
 async def create_route(route: schemas.Route):
     _dict = route.dict()
-    _id = await Route.get(_dict["id"])
-    if _id:
-        raise HTTPException(status_code=409, detail=f"Route {_dict['id']} exists")    
     route = await Route.create(**_dict)
+    if route is None:
+        raise HTTPException(status_code=409, detail=f"Route {_dict['id']} exists")
     return route
 
+@api_route.post("/bulk", response_model=List[schemas.BulkResult], summary="Create or upsert routes in bulk")
+async def create_routes_bulk(routes: List[schemas.Route], upsert: bool = False):
+    return await bulk_create(Route, routes, upsert)
+
 @api_route.get("/{id}", response_model=schemas.Route, summary="Get a route by ID")
 async def get_route(id:int = Path(..., gt=0)):
     route = await Route.get(id)
@@ -190,18 +267,15 @@ async def get_route(id:int = Path(..., gt=0)):
 
 @api_route.put("/{id}", response_model=schemas.Route, summary="Update a route")
 async def update_route(route: schemas.RouteBase, id:int = Path(..., gt=0),):
-    _route = await Route.get(id)
-    if _route is None:
-        raise HTTPException(status_code=404, detail="Route not found")
     route = await Route.update(id, **route.dict())
+    if route is None:
+        raise HTTPException(status_code=404, detail="Route not found")
     return schemas.Route.from_orm(route)
 
 @api_route.delete("/{id}", summary="Delete a route")
 async def delete_route(id:int = Path(..., gt=0)):
-    route = await Route.get(id)
-    if route is None:
+    if not await Route.delete(id):
         raise HTTPException(status_code=404, detail="Route not found")
-    await Route.delete(id)
     return {"detail": "Delete succesfully"}
 
 @api_route.get("/", response_model=List[schemas.Route], summary="Get routes by name")
@@ -211,48 +285,174 @@ async def get_route_by_name(name:str):
         raise HTTPException(status_code=404, detail="Route not found")
     return routes
 
-api_routes = APIRouter(prefix="/routes", tags=["route"])
-@api_routes.get("/",response_model=List[schemas.Route],summary="Get all routes")
-async def get_routes():
-    route = await Route.get_all()
-    return route
+api_routes = APIRouter(prefix="/routes", tags=["route"], dependencies=[etag(Route)])
+@api_routes.get("/search", response_model=List[schemas.Route], summary="Search routes by partial name")
+async def search_routes(q: str = Query(..., min_length=1), limit: int = SEARCH_LIMIT):
+    return await Route.search(q, limit)
+
+@api_routes.get("/",response_model=schemas.Page[schemas.Route],summary="Get all routes")
+async def get_routes(response: Response, limit: int = PAGE_LIMIT, after: Optional[str] = None, ids: Optional[str] = IDS):
+    if ids:
+        return await get_by_ids(Route, ids)
+    if Config.FAST_JSON:
+        return await fast_page(Route, limit, after, response)
+    route, _next = await Route.get_page(limit, after)
+    return {"items": route, "next": _next}
 
 '''RouteDetail'''
 
-api_routedetail = APIRouter(prefix="/routedetail", tags=["routedetail"])
+api_routedetail = APIRouter(prefix="/routedetail", tags=["routedetail"], dependencies=[etag(RouteDetail, Route, Vehicle, Driver)])
 
-@api_routedetail.get("/", response_model=List[schemas.RouteDetail], summary="Get a route detail by route's name, vehicle's name or driver's name")
-async def get_route_detail_by_name(route_name: Optional[str]=None, vehicle_name: Optional[str]=None, driver_name: Optional[str]=None):
+@api_routedetail.get("/", response_model=List[schemas.RouteDetailExpanded], response_model_exclude_unset=True, summary="Get a route detail by route's name, vehicle's name or driver's name")
+async def get_route_detail_by_name(route_name: Optional[str]=None, vehicle_name: Optional[str]=None, driver_name: Optional[str]=None, expand: Optional[str]=EXPAND):
     if not (route_name or vehicle_name or driver_name):
         return []
-    result = await RouteDetail.get_by_name(route_name, vehicle_name, driver_name)
-    return result
+    expand = parse_expand(expand)
+    result = await RouteDetail.get_by_name(route_name, vehicle_name, driver_name, expand)
+    return expand_details(result, expand)
 
 @api_routedetail.post("/",response_model=schemas.RouteDetail, status_code=201, summary="Create a route detail")
 async def create_route_detail(routedetail: schemas.RouteDetail):
-    routedetail = await RouteDetail.create(**routedetail.dict())
+    _dict = routedetail.dict()
+    try:
+        routedetail = await RouteDetail.create(**_dict)
+    except IntegrityError:
+        raise HTTPException(status_code=404, detail="Route, vehicle or driver not found")
+    if routedetail is None:
+        raise HTTPException(status_code=409, detail=f"Route detail {_dict['route_id']}/{_dict['vehicle_id']} exists")
     return schemas.RouteDetail.from_orm(routedetail)
 
+@api_routedetail.post("/bulk", response_model=List[schemas.BulkResult], summary="Create or upsert route details in bulk")
+async def create_routedetails_bulk(routedetails: List[schemas.RouteDetail], upsert: bool = False):
+    return await bulk_create(RouteDetail, routedetails, upsert)
+
+@api_routedetail.post("/import", summary="Import route details from a CSV body")
+async def import_route_details(request: Request):
+    try:
+        return await import_routedetails(request.stream())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 @api_routedetail.delete("/", summary="Delete a route detail")
 async def delete_route_detail(route_id:int, vehicle_id: int, driver_id:int):
-    route = await RouteDetail.get_id(route_id)
-    if route == []:
+    if not await RouteDetail.delete_id(route_id, vehicle_id, driver_id):
         raise HTTPException(status_code=404, detail="Route not found")
-    await RouteDetail.delete_id(route_id, vehicle_id, driver_id)
     return {"detail": "Delete succesfully"}
 
-@api_routedetail.get("/{id}", response_model=List[schemas.RouteDetail], summary="Get route details by ID")
-async def get_route_detail(id:int = Path(..., gt=0)):
-    routedetail = await RouteDetail.get_id(id)
+@api_routedetail.get("/{id}", response_model=List[schemas.RouteDetailExpanded], response_model_exclude_unset=True, summary="Get route details by ID")
+async def get_route_detail(id:int = Path(..., gt=0), expand: Optional[str]=EXPAND):
+    expand = parse_expand(expand)
+    routedetail = await RouteDetail.get_id(id, expand)
     if routedetail == []:
         raise HTTPException(status_code=404, detail="Route not found")
-    return routedetail
-
-api_routedetails = APIRouter(prefix="/routedetails", tags=["routedetail"])
-@api_routedetails.get("/",response_model=List[schemas.RouteDetail],summary="Get all route details")
-async def get_routedetails():
-    routedetail = await RouteDetail.get_all()
-    return routedetail
+    return expand_details(routedetail, expand)
+
+api_routedetails = APIRouter(prefix="/routedetails", tags=["routedetail"], dependencies=[etag(RouteDetail, Route, Vehicle, Driver)])
+@api_routedetails.get("/",response_model=schemas.Page[schemas.RouteDetailExpanded],response_model_exclude_unset=True,summary="Get all route details")
+async def get_routedetails(response: Response, limit: int = PAGE_LIMIT, after: Optional[str] = None, expand: Optional[str] = EXPAND):
+    expand = parse_expand(expand)
+    if Config.FAST_JSON and not expand:
+        return await fast_page(RouteDetail, limit, after, response)
+    routedetail, _next = await RouteDetail.get_page(limit, after, RouteDetail.expand(expand))
+    return {"items": expand_details(routedetail, expand), "next": _next}
+
+
+'''Export'''
+
+api_export = APIRouter(prefix="/export", tags=["export"])
+
+EXPORTS = {
+    "fleets": Fleet,
+    "vehicles": Vehicle,
+    "drivers": Driver,
+    "routes": Route,
+    "routedetails": RouteDetail,
+}
+
+async def export_ndjson(model):
+    async for chunk in model.stream_all(Config.EXPORT_CHUNK_SIZE):
+        yield "".join(json.dumps(dict(row._mapping)) + "\n" for row in chunk)
+
+async def export_csv(model):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(model.__table__.columns.keys())
+    async for chunk in model.stream_all(Config.EXPORT_CHUNK_SIZE):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@api_export.get("/{entity}", summary="Stream a whole table as NDJSON or CSV")
+async def export_entity(entity: str, format: str = Query("ndjson", regex="^(ndjson|csv)$")):
+    model = EXPORTS.get(entity)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    if format == "csv":
+        return StreamingResponse(export_csv(model), media_type="text/csv")
+    return StreamingResponse(export_ndjson(model), media_type="application/x-ndjson")
+
+'''Stream'''
+
+api_stream = APIRouter(prefix="/stream", tags=["stream"])
+
+TABLES = Query(None, regex=r"^(fleets|vehicles|drivers|routes|routedetail)(,(fleets|vehicles|drivers|routes|routedetail))*$")
+
+async def change_events(subscription):
+    try:
+        while True:
+            try:
+                frame = await asyncio.wait_for(subscription.queue.get(), Config.STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                frame = b": keep-alive\n\n"
+            if frame:
+                yield frame
+            if subscription.overflowed and subscription.queue.empty():
+                yield b"event: resync\ndata: {}\n\n"
+                return
+    finally:
+        changes.unsubscribe(subscription)
+
+@api_stream.get("/changes", summary="Server-sent change events, optionally for some tables, a fleet or a route")
+async def stream_changes(tables: Optional[str] = TABLES, fleet: Optional[int] = None, route: Optional[int] = None):
+    if not changes.enabled:
+        raise HTTPException(status_code=404, detail="Change feed is off")
+    subscription = await changes.subscribe(
+        Subscription(tables.split(",") if tables else None, fleet=fleet, route=route)
+    )
+    return StreamingResponse(
+        change_events(subscription), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+'''Cache'''
+
+api_cache = APIRouter(prefix="/cache", tags=["cache"])
+
+@api_cache.get("/stats", summary="Entity cache hit, miss and eviction counters")
+async def get_cache_stats():
+    return await cache.stats()
+
+api_timing = APIRouter(prefix="/timing", tags=["timing"])
+
+@api_timing.get("/stats", summary="Per-route wall time, DB time, statement and row counts")
+async def get_timing_stats():
+    return timings.stats()
+
+api_metrics = APIRouter(tags=["metrics"])
+
+@api_metrics.get("/metrics", summary="Prometheus text exposition", include_in_schema=False)
+async def get_metrics():
+    body, content_type = exposition()
+    return Response(body, media_type=content_type)
+
+api_admin = APIRouter(prefix="/admin", tags=["admin"])
+
+@api_admin.get("/slow-queries", summary="Recent slow statements with their captured plans")
+async def get_slow_queries():
+    return slow_queries.stats()
 
 
 
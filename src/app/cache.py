@@ -0,0 +1,139 @@
+"""Read-through cache for entity lookups.
+
+Values are plain dicts of column values so both backends behave the same.
+`cache.get` returns None on a miss, None is never stored.
+"""
+import json
+import time
+from collections import OrderedDict
+
+from app.config import Config
+from app.metrics import cache_hits, cache_misses
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+class MemoryCache:
+    """Bounded per-process LRU with a TTL on every entry."""
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    async def get(self, key):
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    async def get_many(self, keys):
+        return [await self.get(key) for key in keys]
+    async def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+    async def delete(self, *keys):
+        for key in keys:
+            self._data.pop(key, None)
+    async def clear(self, prefix=""):
+        for key in [key for key in self._data if key.startswith(prefix)]:
+            del self._data[key]
+    async def stats(self):
+        return {
+            "backend": "memory",
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+class RedisCache:
+    """Shared cache on any Redis-protocol server, invalidations reach every worker."""
+    def __init__(self, url, ttl):
+        if aioredis is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the `redis` package")
+        self.ttl = ttl
+        self._client = aioredis.from_url(url)
+        self.hits = 0
+        self.misses = 0
+    async def get(self, key):
+        value = await self._client.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+    async def get_many(self, keys):
+        values = await self._client.mget(keys) if keys else []
+        self.hits += sum(1 for value in values if value is not None)
+        self.misses += sum(1 for value in values if value is None)
+        return [None if value is None else json.loads(value) for value in values]
+    async def set(self, key, value):
+        await self._client.set(key, json.dumps(value), ex=self.ttl)
+    async def delete(self, *keys):
+        if keys:
+            await self._client.delete(*keys)
+    async def clear(self, prefix=""):
+        keys = [key async for key in self._client.scan_iter(match=prefix + "*")]
+        if keys:
+            await self._client.delete(*keys)
+    async def stats(self):
+        info = await self._client.info("stats")
+        return {
+            "backend": "redis",
+            "size": await self._client.dbsize(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": info.get("evicted_keys", 0),
+        }
+
+class NullCache:
+    async def get(self, key):
+        return None
+    async def get_many(self, keys):
+        return [None] * len(keys)
+    async def set(self, key, value):
+        pass
+    async def delete(self, *keys):
+        pass
+    async def clear(self, prefix=""):
+        pass
+    async def stats(self):
+        return {"backend": "none"}
+
+class EntityCache:
+    def __init__(self):
+        self._backend = NullCache()
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+    async def get(self, key):
+        value = await self._backend.get(key)
+        (cache_misses if value is None else cache_hits).inc()
+        return value
+    async def get_many(self, keys):
+        values = await self._backend.get_many(keys)
+        hits = sum(1 for value in values if value is not None)
+        cache_hits.inc(hits)
+        cache_misses.inc(len(values) - hits)
+        return values
+    def init(self, backend=None):
+        backend = backend or Config.CACHE_BACKEND
+        if backend == "memory":
+            self._backend = MemoryCache(Config.CACHE_SIZE, Config.CACHE_TTL)
+        elif backend == "redis":
+            self._backend = RedisCache(Config.CACHE_URL, Config.CACHE_TTL)
+        else:
+            self._backend = NullCache()
+
+cache = EntityCache()
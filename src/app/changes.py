@@ -0,0 +1,183 @@
+"""Change feed: compact events for every committed write, fanned out to subscribers.
+
+Off unless `Config.CHANGE_FEED` is set: every NOTIFY takes a lock that
+serializes commits, writes should only pay for it when something listens.
+
+On PostgreSQL the write statements `pg_notify` the event themselves (see
+`ChangeFeed.notifying`), so it is delivered exactly when the write commits,
+to every worker, without another round trip. Each worker keeps one
+dedicated LISTEN connection, outside the pool, opened with its first
+subscriber. Other databases only reach the subscribers of the same
+process, dispatched once the session commits.
+
+An event is `{"table": ..., "op": "insert"|"update"|"delete", "row": {...}}`
+for a single row, `{"table": ..., "op": "bulk", "row": {...}}` for each row
+a bulk write created or updated, or `{"table": ..., "op": "bulk", "count": n}`
+for a COPY import, whose rows are not sent. Route detail events also carry
+`"fleet"`, the owner of their vehicle, for `fleet=` subscriptions. It is serialized once and the same bytes go to every
+subscriber, which only costs one bounded queue each.
+"""
+import asyncio
+import json
+import logging
+
+import asyncpg
+from sqlalchemy import Text, cast, event, func, literal, literal_column, select
+
+from app.config import Config
+from app.database import RoutingSession, db
+
+logger = logging.getLogger("app.changes")
+
+CHANNEL = "changes"
+
+# filter name -> table -> column holding the filtered id, None for the event's own field
+FILTERS = {
+    "fleet": {"fleets": "id", "vehicles": "owner_id", "routedetail": None},
+    "route": {"routes": "id", "routedetail": "route_id"},
+}
+
+class Subscription:
+    def __init__(self, tables=None, maxsize=1000, **filters):
+        self.tables = set(tables) if tables else None
+        self.filters = {name: value for name, value in filters.items() if value is not None}
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+    def matches(self, change):
+        table = change["table"]
+        if self.tables is not None and table not in self.tables:
+            return False
+        if not self.filters:
+            return True
+        for name, value in self.filters.items():
+            if table not in FILTERS[name]:
+                continue
+            column = FILTERS[name][table]
+            row = change.get("row")
+            if row is None or (change.get(name) if column is None else row.get(column)) == value:
+                return True
+        return False
+    def put(self, frame):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # A consumer this far behind has to resync, stop feeding it.
+            self.overflowed = True
+
+def frame(change):
+    return f"event: change\ndata: {json.dumps(change, separators=(',', ':'))}\n\n".encode()
+
+def _text(value):
+    # asyncpg cannot infer the type of json_build_object's arguments
+    return cast(literal(value), Text)
+
+class ChangeFeed:
+    def __init__(self):
+        self.subscriptions = set()
+        self.listeners = []
+        self._listener = None
+        self._starting = None
+    @property
+    def enabled(self):
+        return Config.CHANGE_FEED
+    def notifying(self, statement, table, op, context=None):
+        """Wrap a DML `statement` with RETURNING so the same round trip notifies its change.
+
+        Returns `WITH written AS (statement) SELECT written.*, pg_notify(...) FROM
+        written`, one event per returned row, so the statement must return every
+        column. `context(written.c)` may add fields as SQL expressions. The rows
+        come back with an extra `notified` column.
+        """
+        written = statement.cte("written")
+        fields = [
+            _text("table"), _text(table), _text("op"), _text(op),
+            _text("row"), func.row_to_json(literal_column(written.name)),
+        ]
+        for name, expression in (context(written.c) if context else {}).items():
+            fields += [_text(name), expression]
+        payload = func.json_build_object(*fields)
+        notified = func.pg_notify(CHANNEL, cast(payload, Text)).label("notified")
+        return select(written, notified).execution_options(writes=True)
+    async def publish(self, table, op, row=None, count=None, **context):
+        """Record a change inside the current write's transaction, before its commit.
+
+        Writes that can go through `notifying` on PostgreSQL should, this costs
+        a round trip there.
+        """
+        if not self.enabled:
+            return
+        change = {"table": table, "op": op}
+        if row is not None:
+            change["row"] = row
+        if count is not None:
+            change["count"] = count
+        change.update(context)
+        if db.get_bind().dialect.name == "postgresql":
+            # On the write's own connection, `db.execute` could route a SELECT to a replica
+            conn = await db.connection()
+            await conn.execute(select(func.pg_notify(CHANNEL, json.dumps(change, separators=(",", ":")))))
+        else:
+            db.info.setdefault("changes", []).append(change)
+    def dispatch(self, change):
+        for listener in self.listeners:
+            listener(change)
+        encoded = frame(change)
+        for subscription in list(self.subscriptions):
+            if not subscription.overflowed and subscription.matches(change):
+                subscription.put(encoded)
+    async def subscribe(self, subscription):
+        if not self.enabled:
+            raise RuntimeError("The change feed is off, set CHANGE_FEED=1")
+        if db.engine.dialect.name == "postgresql":
+            await self._listen()
+        self.subscriptions.add(subscription)
+        return subscription
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+    async def listen(self, listener):
+        """Call `listener(change)` with every change dict, in-process consumers like the read model."""
+        if not self.enabled:
+            raise RuntimeError("The change feed is off, set CHANGE_FEED=1")
+        if db.engine.dialect.name == "postgresql":
+            await self._listen()
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+    def unlisten(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+    async def _listen(self):
+        if self._listener is None:
+            if self._starting is None or self._starting.done():
+                self._starting = asyncio.ensure_future(self._connect())
+            await asyncio.shield(self._starting)
+    async def _connect(self):
+        url = db.engine.url.set(drivername="postgresql")
+        conn = await asyncpg.connect(url.render_as_string(hide_password=False))
+        await conn.add_listener(CHANNEL, self._notified)
+        conn.add_termination_listener(self._terminated)
+        self._listener = conn
+    def _notified(self, conn, pid, channel, payload):
+        self.dispatch(json.loads(payload))
+    def _terminated(self, conn):
+        logger.warning("change feed listener connection lost, subscribers must resync")
+        self._listener = None
+        for listener in self.listeners:
+            listener({"table": None, "op": "resync"})
+        for subscription in list(self.subscriptions):
+            subscription.overflowed = True
+            subscription.put(b"")
+    async def close(self):
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            await listener.close()
+
+changes = ChangeFeed()
+
+@event.listens_for(RoutingSession, "after_commit")
+def _dispatch_committed(session):
+    for change in session.info.pop("changes", ()):
+        changes.dispatch(change)
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _discard_rolled_back(session, previous_transaction):
+    session.info.pop("changes", None)
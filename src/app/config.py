@@ -7,4 +7,46 @@ class Config:
     DB_HOST = os.getenv("DB_HOST", "db")
 
     DB_CONFIG = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
-    
\ No newline at end of file
+
+    # Comma separated read replica URLs, GET traffic is spread over them.
+    DB_REPLICAS = [url for url in os.getenv("DB_REPLICAS", "").split(",") if url]
+    # Seconds after a client's write during which its reads still go to the primary.
+    DB_REPLICA_STALENESS = float(os.getenv("DB_REPLICA_STALENESS", "2"))
+
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    # Pings every connection on checkout, one more round trip per checkout; DB_POOL_RECYCLE usually suffices.
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "0") == "1"
+    # Logs every statement, debugging only: it costs a lot of throughput.
+    DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+    # Refuse to start unless the database is at the migrations' head revision.
+    SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "1") == "1"
+    STARTUP_TIMEOUT = float(os.getenv("STARTUP_TIMEOUT", "10"))
+
+    EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+    BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+
+    # "memory", "redis" or "none". ETag versions live in the same place: "redis" is what
+    # keeps several gunicorn workers consistent, and the only backend allowing more than one.
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_SIZE = int(os.getenv("CACHE_SIZE", "10000"))
+    CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+    CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+    # Fraction of slow SELECTs re-run under EXPLAIN ANALYZE, 0 turns it off.
+    SLOW_QUERY_SAMPLE = float(os.getenv("SLOW_QUERY_SAMPLE", "0"))
+    SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+
+    # Publish every write to the change feed, needed by /stream/changes and READ_MODEL.
+    CHANGE_FEED = os.getenv("CHANGE_FEED", "0") == "1"
+    # Seconds between keep-alive comments on idle /stream/changes connections.
+    STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))
+
+    # In-memory read model: "off", "eventual" or "strict" (read-your-writes, else SQL).
+    READ_MODEL = os.getenv("READ_MODEL", "off")
+
+    FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
@@ -0,0 +1,80 @@
+"""Streaming CSV import of route details.
+
+    python -m app.importer routedetails.csv
+
+The CSV needs a `route_id,vehicle_id,driver_id` header, `driver_id` may be empty.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import sys
+
+from app.api.models import RouteDetail
+from app.cache import cache
+from app.database import db
+from app.versions import versions
+
+COLUMNS = ("route_id", "vehicle_id", "driver_id")
+READ_SIZE = 64 * 1024
+
+def _record(row, positions, line):
+    try:
+        route_id, vehicle_id, driver_id = (row[i].strip() for i in positions)
+        return int(route_id), int(vehicle_id), int(driver_id) if driver_id else None
+    except (IndexError, ValueError):
+        raise ValueError(f"Invalid route detail on line {line}")
+
+async def csv_records(chunks):
+    """Turn an async iterable of byte chunks into route detail tuples."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    positions = None
+    line = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for row in csv.reader(lines):
+            line += 1
+            if not row:
+                continue
+            if positions is None:
+                header = [name.strip() for name in row]
+                if not set(COLUMNS) <= set(header):
+                    raise ValueError(f"CSV header must contain {', '.join(COLUMNS)}")
+                positions = [header.index(name) for name in COLUMNS]
+                continue
+            yield _record(row, positions, line)
+    pending += decoder.decode(b"", final=True)
+    for row in csv.reader([pending]):
+        if row and positions is not None:
+            yield _record(row, positions, line + 1)
+
+async def import_routedetails(chunks):
+    return await RouteDetail.copy_records(csv_records(chunks))
+
+async def _read_file(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+async def main(path):
+    db.init()
+    # The shared (Redis) backends, so the running API sees the import
+    cache.init()
+    versions.init()
+    try:
+        async with db.scope():
+            result = await import_routedetails(_read_file(path))
+    finally:
+        await db.close()
+    print(json.dumps(result))
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m app.importer FILE.csv")
+    asyncio.run(main(sys.argv[1]))
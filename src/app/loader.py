@@ -0,0 +1,49 @@
+"""DataLoader-style batching of `CoreModel.get` calls.
+
+Every `load` issued during the same event-loop tick is queued, the next
+tick runs one `get_many` per model and resolves all the waiting futures.
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_loader = ContextVar("batch_loader", default=None)
+
+class BatchLoader:
+    def __init__(self):
+        self._pending = {}
+    def load(self, model, id):
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(model)
+        if pending is None:
+            pending = self._pending[model] = {}
+            loop.call_soon(self._dispatch, model)
+        future = pending.get(id)
+        if future is None:
+            future = pending[id] = loop.create_future()
+        return future
+    def _dispatch(self, model):
+        pending = self._pending.pop(model)
+        task = asyncio.ensure_future(model._fetch_many(list(pending)))
+        task.add_done_callback(lambda task: self._resolve(pending, task))
+    def _resolve(self, pending, task):
+        for id, future in pending.items():
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result().get(id))
+
+def current_loader():
+    return _loader.get()
+
+@contextmanager
+def loader_scope():
+    token = _loader.set(BatchLoader())
+    try:
+        yield
+    finally:
+        _loader.reset(token)
@@ -1,11 +1,23 @@
 from fastapi import FastAPI
 app = FastAPI()
 
-from app.database import db
-from app.api import ping
+from app.api.etag import NotModified, not_modified_handler
+from app.cache import cache
+from app.changes import changes
+from app.database import db, SessionMiddleware
+from app.timing import TimingMiddleware
+from app.versions import versions
+from app.api import health, ping
+from app.startup import startup as prepare
 
 db.init()
+cache.init()
+versions.init()
+app.add_middleware(SessionMiddleware)
+app.add_middleware(TimingMiddleware)
+app.add_exception_handler(NotModified, not_modified_handler)
 app.include_router(ping.router)
+app.include_router(health.router)
 
 """ @app.get("/pong")
 async def pong():
@@ -13,15 +25,16 @@ async def pong():
 
 @app.on_event("startup")
 async def startup():
-    await db.create_all()
+    await prepare()
 
 @app.on_event("shutdown")
 async def shutdown():
+    await changes.close()
     await db.close()
 
 from app.api.views import *
 apis = [api_fleets, api_fleet, api_vehicles, api_vehicle, api_drivers, api_driver, 
-api_routes, api_route, api_routedetails, api_routedetail]
+api_routes, api_route, api_routedetails, api_routedetail, api_export, api_stream, api_cache, api_timing, api_metrics, api_admin]
 
 for api in apis:
     app.include_router(api)
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Prometheus metrics for HTTP requests, the connection pool and the entity cache.
+
+Single process, the default registry is scraped directly. With several
+workers, start every worker with `PROMETHEUS_MULTIPROC_DIR` pointing at
+an empty directory shared by all of them: each process then writes its
+samples to its own mmap'd files and `/metrics` sums them at scrape time,
+so no lock is ever shared between workers.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by router, route and status code",
+    ["router", "method", "route", "status"],
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "Wall time of HTTP requests",
+    ["router", "method", "route"], buckets=LATENCY_BUCKETS,
+)
+http_db_latency = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per HTTP request",
+    ["router", "method", "route"], buckets=LATENCY_BUCKETS,
+)
+http_statements = Counter(
+    "http_request_statements_total", "SQL statements executed by HTTP requests",
+    ["router", "method", "route"],
+)
+
+pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections currently checked out of the pool", ["engine"], multiprocess_mode="livesum",
+)
+pool_overflow = Gauge(
+    "db_pool_overflow", "Connections open beyond the pool size", ["engine"], multiprocess_mode="livesum",
+)
+pool_wait = Histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a pooled connection", buckets=LATENCY_BUCKETS,
+)
+pool_timeouts = Counter("db_pool_timeouts_total", "Pool checkouts that timed out")
+
+cache_lookups = Counter("cache_lookups_total", "Entity cache lookups", ["result"])
+cache_hits = cache_lookups.labels("hit")
+cache_misses = cache_lookups.labels("miss")
+
+def router_of(path):
+    """Router prefix of a route template: `/vehicle/{id}` belongs to `/vehicle`."""
+    return "/" + path.split("/")[1] if path.startswith("/") else path
+
+def observe_request(method, path, status, timing):
+    router = router_of(path)
+    http_requests.labels(router, method, path, str(status)).inc()
+    http_latency.labels(router, method, path).observe(timing.elapsed)
+    http_db_latency.labels(router, method, path).observe(timing.db)
+    http_statements.labels(router, method, path).inc(timing.statements)
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long each checkout waited."""
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeout:
+            pool_timeouts.inc()
+            raise
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+def _pool_changed(pool, name):
+    pool_checked_out.labels(name).set(pool.checkedout())
+    pool_overflow.labels(name).set(max(pool.overflow(), 0))
+
+def instrument_pool(engine, name):
+    """Keep the pool gauges of engine `name` current; a no-op for pools without checkout counts."""
+    if not hasattr(engine.pool, "checkedout"):
+        return
+    # engine.pool, not the pool itself: `dispose()` swaps in a new one.
+    event.listen(engine, "checkout", lambda *args: _pool_changed(engine.pool, name))
+    event.listen(engine, "checkin", lambda *args: _pool_changed(engine.pool, name))
+
+def registry():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return REGISTRY
+
+def exposition():
+    """(body, content type) of the text exposition format."""
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
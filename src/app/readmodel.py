@@ -0,0 +1,234 @@
+"""Per-worker in-memory copy of the fleet/route graph.
+
+With `Config.READ_MODEL` set to "eventual" or "strict", every model with
+`__read_indexes__` is loaded in bulk at startup into a `Table`: its rows
+as the same namedtuple records `CoreModel` returns, a dict by primary key
+and one hash index per listed column. Afterwards the change feed keeps it
+current row by row, bulk writes included; a COPY import, which sends no
+rows, or a lost LISTEN connection reloads the affected tables, and events
+that arrive during a load are replayed on top of it.
+
+"eventual" answers from memory whenever the tables are loaded. "strict"
+also falls back to SQL whenever the request could otherwise miss its own
+writes, i.e. whenever its reads would be pinned to the primary (see
+`AsyncDatabaseSession.bind_for`). "off" disables it.
+"""
+import asyncio
+import logging
+from collections import namedtuple
+
+from app.changes import changes
+from app.config import Config
+from app.database import Base, db
+
+logger = logging.getLogger("app.readmodel")
+
+class Table:
+    """Rows of one table by primary key, with hash indexes on some columns."""
+    __slots__ = ("model", "key", "rows", "indexes", "loading", "pending")
+    def __init__(self, model):
+        self.model = model
+        self.key = tuple(column.key for column in model.__mapper__.primary_key)
+        self.rows = {}
+        self.indexes = {column: {} for column in model.__read_indexes__}
+        self.loading = True
+        self.pending = []
+    def _key(self, values):
+        if len(self.key) == 1:
+            return values[self.key[0]]
+        return tuple(values[column] for column in self.key)
+    def _add(self, record):
+        key = self._key(record._asdict())
+        self.rows[key] = record
+        for column, index in self.indexes.items():
+            index.setdefault(getattr(record, column), set()).add(key)
+    def _remove(self, key):
+        record = self.rows.pop(key, None)
+        if record is not None:
+            for column, index in self.indexes.items():
+                keys = index.get(getattr(record, column))
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del index[getattr(record, column)]
+        return record
+    def load(self, records):
+        self.rows = {}
+        self.indexes = {column: {} for column in self.indexes}
+        for record in records:
+            self._add(record)
+    def upsert(self, values):
+        existing = self._remove(self._key(values))
+        self._add(existing._replace(**values) if existing is not None else self.model.record(**values))
+    def delete(self, values):
+        return self._remove(self._key(values))
+    def get(self, key):
+        return self.rows.get(key)
+    def where(self, column, value):
+        """Records with `column == value`, in primary key order."""
+        index = self.indexes.get(column)
+        if index is None:
+            keys = [key for key, record in self.rows.items() if getattr(record, column) == value]
+        else:
+            keys = index.get(value, ())
+        return [self.rows[key] for key in sorted(keys)]
+
+class ReadModel:
+    def __init__(self):
+        self.mode = "off"
+        self.tables = {}
+        self._cascades = {}
+        self._reloads = set()
+        self._task = None
+    async def start(self, mode=None):
+        self.mode = mode or Config.READ_MODEL
+        if self.mode == "off":
+            return
+        models = [
+            mapper.class_ for mapper in Base.registry.mappers
+            if getattr(mapper.class_, "__read_indexes__", None) is not None
+        ]
+        self.tables = {model.__tablename__: Table(model) for model in models}
+        # parent table -> [(child table, foreign key column, parent column)] deleted with it
+        self._cascades = {}
+        for model in models:
+            for fk in model.__table__.foreign_keys:
+                if fk.ondelete == "cascade":
+                    self._cascades.setdefault(fk.column.table.name, []).append(
+                        (model.__tablename__, fk.parent.key, fk.column.key)
+                    )
+        # Listen before loading, so nothing committed in between is missed.
+        await changes.listen(self.apply)
+        await self._load(list(self.tables))
+    def stop(self):
+        changes.unlisten(self.apply)
+        self.mode = "off"
+        self.tables = {}
+    async def _load(self, names):
+        for name in names:
+            self.tables[name].loading = True
+        # A replica may not have the writes committed before `listen` yet
+        async with db.scope(primary=True):
+            for name in names:
+                table = self.tables[name]
+                results = await db.execute(table.model._select())
+                table.load(table.model.record(**row._mapping) for row in results)
+                pending, table.pending = table.pending, []
+                for change in pending:
+                    self._apply(table, change)
+                # A replayed COPY import queues this table for another load
+                table.loading = name in self._reloads
+        logger.info("read model loaded %s", ", ".join(f"{name}: {len(self.tables[name].rows)}" for name in names))
+    def _reload(self, names):
+        self._reloads.update(names)
+        for name in names:
+            self.tables[name].loading = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._reload_pending())
+    async def _reload_pending(self):
+        while self._reloads:
+            names, self._reloads = list(self._reloads), set()
+            try:
+                await changes.listen(self.apply)
+                await self._load(names)
+            except Exception:
+                logger.exception("read model reload failed, serving %s from SQL", ", ".join(names))
+                await asyncio.sleep(1)
+                self._reloads.update(names)
+    async def drain(self):
+        """Wait for pending reloads."""
+        while self._task is not None and not self._task.done():
+            await self._task
+    def apply(self, change):
+        """Change feed listener."""
+        if change["op"] == "resync":
+            self._reload(list(self.tables))
+            return
+        table = self.tables.get(change["table"])
+        if table is None:
+            return
+        if table.loading:
+            table.pending.append(change)
+            return
+        self._apply(table, change)
+    def _apply(self, table, change):
+        op = change["op"]
+        if "row" not in change:
+            self._reload([table.model.__tablename__])
+        elif op == "delete":
+            self._delete(table, change["row"])
+        else:
+            table.upsert(change["row"])
+    def _delete(self, table, values):
+        record = table.delete(values)
+        if record is None:
+            return
+        for name, column, parent in self._cascades.get(table.model.__tablename__, ()):
+            child = self.tables[name]
+            for row in child.where(column, getattr(record, parent)):
+                self._delete(child, row._asdict())
+    def serves(self, *models):
+        """Whether reads of these models can be answered from memory right now."""
+        if self.mode == "off":
+            return False
+        for model in models:
+            table = self.tables.get(model.__tablename__)
+            if table is None or table.loading:
+                return False
+        return self.mode != "strict" or not db.pinned()
+    def get(self, model, key):
+        return self.tables[model.__tablename__].get(key)
+    def where(self, model, column, value):
+        return self.tables[model.__tablename__].where(column, value)
+    def find(self, model, filters, expand=()):
+        """`CoreModel.find` from memory, None when it has to go to SQL."""
+        relations = model.__mapper__.relationships
+        related = {
+            relations[path.split(".")[0]].mapper.class_
+            for name, path in model.__filters__.items() if name in filters and "." in path
+        } | {relations[name].mapper.class_ for name in expand}
+        if not self.serves(model, *related):
+            return None
+        table = self.tables[model.__tablename__]
+        keys = None
+        for name, value in filters.items():
+            path = model.__filters__[name]
+            if "." in path:
+                relation, column = path.split(".")
+                (local, remote), = relations[relation].local_remote_pairs
+                records = []
+                for parent in self.where(relations[relation].mapper.class_, column, value):
+                    records.extend(table.where(local.key, getattr(parent, remote.key)))
+            else:
+                records = table.where(path, value)
+            found = {table._key(record._asdict()) for record in records}
+            keys = found if keys is None else keys & found
+        records = [table.rows[key] for key in sorted(keys or ())]
+        return self.expand(model, records, expand)
+    def expand(self, model, records, expand):
+        """Records with the named many-to-one relationships attached as attributes."""
+        if not expand:
+            return records
+        relations = model.__mapper__.relationships
+        Expanded = _expanded(model, tuple(expand))
+        joins = []
+        for name in expand:
+            (local, remote), = relations[name].local_remote_pairs
+            joins.append((name, local.key, self.tables[relations[name].mapper.class_.__tablename__]))
+        return [
+            Expanded(**record._asdict(), **{
+                name: table.get(getattr(record, local)) for name, local, table in joins
+            })
+            for record in records
+        ]
+
+_expanded_types = {}
+
+def _expanded(model, expand):
+    Expanded = _expanded_types.get((model, expand))
+    if Expanded is None:
+        fields = [column.key for column in model.__table__.columns] + list(expand)
+        Expanded = _expanded_types[(model, expand)] = namedtuple(model.__name__ + "Expanded", fields)
+    return Expanded
+
+read_model = ReadModel()
@@ -0,0 +1,25 @@
+"""Coalesce identical concurrent calls into one.
+
+The first caller for a key starts the call as a task, callers arriving
+while it runs await the same task. The task is shielded, so a cancelled
+caller does not cancel it for the others.
+"""
+import asyncio
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+    def __len__(self):
+        return len(self._calls)
+    async def do(self, key, fn, *args):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+flights = SingleFlight()
@@ -0,0 +1,111 @@
+"""Slow-query log with optional EXPLAIN capture.
+
+Every statement slower than `Config.SLOW_QUERY_MS` is logged with its
+normalized SQL, the shape of its parameters, its duration and the
+`CoreModel` method that issued it, and kept in a bounded ring buffer.
+With `Config.SLOW_QUERY_SAMPLE` above zero, that fraction of slow SELECTs
+is re-run under `EXPLAIN (ANALYZE, BUFFERS)` in a read-only transaction
+on a separate connection, and the plan is attached to the entry.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import time
+from collections import deque
+
+import greenlet
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import Config
+
+logger = logging.getLogger("app.slowlog")
+
+_placeholders = re.compile(r"(\?|%s|\$\d+)(\s*,\s*(\?|%s|\$\d+))+")
+_whitespace = re.compile(r"\s+")
+
+def normalize(statement):
+    """One line of SQL with placeholder lists folded, `IN (?, ?, ?)` becomes `IN (?, ...)`."""
+    statement = _whitespace.sub(" ", statement).strip()
+    return _placeholders.sub(r"\1, ...", statement)
+
+def parameters_shape(parameters, executemany=False):
+    if executemany:
+        return f"{len(parameters)} x {parameters_shape(parameters[0]) if parameters else '()'}"
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+def calling_method():
+    """`Model.method` of the outermost CoreModel classmethod on the awaiting stack.
+
+    Cursor events run in SQLAlchemy's worker greenlet; the coroutines that
+    awaited the statement are suspended in its parent.
+    """
+    current = greenlet.getcurrent()
+    frame = current.parent.gr_frame if current.parent is not None else None
+    caller = None
+    while frame is not None:
+        cls = frame.f_locals.get("cls")
+        if isinstance(cls, type) and hasattr(cls, "__tablename__"):
+            caller = f"{cls.__name__}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return caller
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms, sample, size):
+        self.threshold = threshold_ms / 1000
+        self.sample = sample
+        self.entries = deque(maxlen=size)
+        self._tasks = set()
+    def check(self, conn, statement, parameters, executemany, elapsed):
+        if elapsed < self.threshold or statement.startswith("EXPLAIN"):
+            return
+        entry = {
+            "at": time.time(),
+            "duration_ms": round(elapsed * 1000, 3),
+            "caller": calling_method(),
+            "statement": normalize(statement),
+            "parameters": parameters_shape(parameters, executemany),
+            "plan": None,
+        }
+        self.entries.append(entry)
+        logger.warning(
+            "slow query %.1fms in %s: %s %s",
+            entry["duration_ms"], entry["caller"], entry["statement"], entry["parameters"],
+        )
+        if (not executemany and self.sample and random.random() < self.sample
+                and entry["statement"].upper().startswith("SELECT")):
+            task = asyncio.get_running_loop().create_task(
+                self._explain(conn.engine, conn.dialect.name, statement, parameters, entry)
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    async def _explain(self, engine, dialect, statement, parameters, entry):
+        if dialect == "postgresql":
+            explain, read_only = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ", "SET TRANSACTION READ ONLY"
+        else:
+            explain, read_only = "EXPLAIN QUERY PLAN ", None
+        try:
+            async with AsyncEngine(engine).connect() as conn:
+                transaction = await conn.begin()
+                if read_only:
+                    await conn.exec_driver_sql(read_only)
+                result = await conn.exec_driver_sql(explain + statement, tuple(parameters or ()))
+                if dialect == "postgresql":
+                    plan = result.scalar()
+                    entry["plan"] = json.loads(plan) if isinstance(plan, str) else plan
+                else:
+                    entry["plan"] = [list(row) for row in result]
+                await transaction.rollback()
+        except Exception:
+            logger.exception("EXPLAIN failed for %s", entry["statement"])
+    async def drain(self):
+        """Wait for plans still being captured."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    def stats(self):
+        return list(self.entries)
+
+slow_queries = SlowQueryLog(Config.SLOW_QUERY_MS, Config.SLOW_QUERY_SAMPLE, Config.SLOW_QUERY_LOG_SIZE)
@@ -0,0 +1,48 @@
+"""Worker startup: schema revision check and pool warm-up, within a time budget.
+
+The schema is owned by the Alembic migrations (`alembic upgrade head`),
+workers no longer create tables. A worker only reports ready on
+`/readyz` once its database is at the migrations' head revision, its
+pool holds `DB_POOL_SIZE` open connections and its read model, if
+enabled, is loaded.
+"""
+import asyncio
+import logging
+import os
+
+from alembic.script import ScriptDirectory
+
+from app.config import Config
+from app.database import db
+from app.readmodel import read_model
+
+logger = logging.getLogger("app.startup")
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+
+readiness = Readiness()
+
+def head_revision():
+    return ScriptDirectory(MIGRATIONS).get_current_head()
+
+async def check_revision():
+    expected, current = head_revision(), await db.revision()
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at revision {current}, expected {expected}: run `alembic upgrade head`"
+        )
+
+async def prepare():
+    if Config.SCHEMA_CHECK:
+        await check_revision()
+    warmed = await db.warm()
+    logger.info("warmed %d pooled connections", warmed)
+    await read_model.start()
+    readiness.ready = True
+
+async def startup():
+    await asyncio.wait_for(prepare(), Config.STARTUP_TIMEOUT)
@@ -0,0 +1,163 @@
+"""Per-request timing: wall time, DB time, statement and row counts.
+
+`instrument(engine)` hooks the cursor events of an engine so every
+statement run inside a request adds to that request's `RequestTiming`.
+`TimingMiddleware` reports the totals as a `Server-Timing` header and
+folds them into the per-route histograms in `timings`.
+"""
+import bisect
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.metrics import observe_request
+from app.slowlog import slow_queries
+
+_current = ContextVar("request_timing", default=None)
+
+# Upper bounds in milliseconds, the last bucket catches everything above.
+BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+class RequestTiming:
+    __slots__ = ("start", "db", "statements", "rows")
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.statements = 0
+        self.rows = 0
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+    def header(self):
+        return (
+            f"total;dur={self.elapsed * 1000:.1f}, "
+            f'db;dur={self.db * 1000:.1f};desc="{self.statements} statements, {self.rows} rows"'
+        ).encode("latin-1")
+
+def current_timing():
+    return _current.get()
+
+def _returned_rows(cursor):
+    # The asyncio dialects fetch the whole result while executing.
+    if cursor.description is None:
+        return max(cursor.rowcount, 0)
+    return len(getattr(cursor, "_rows", None) or ())
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    timing = _current.get()
+    if timing is not None:
+        timing.db += elapsed
+        timing.statements += 1
+        timing.rows += _returned_rows(cursor)
+    slow_queries.check(conn, statement, parameters, executemany, elapsed)
+
+def instrument(engine):
+    """Attach the statement hooks to a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class Histogram:
+    """Fixed-bucket histogram of durations in milliseconds."""
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+class RouteTimings:
+    """Aggregated wall time, DB time, statements and rows per route."""
+    def __init__(self):
+        self.routes = {}
+    def observe(self, route, timing):
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = {
+                "wall": Histogram(), "db": Histogram(), "statements": 0, "rows": 0,
+            }
+        stats["wall"].observe(timing.elapsed * 1000)
+        stats["db"].observe(timing.db * 1000)
+        stats["statements"] += timing.statements
+        stats["rows"] += timing.rows
+    def stats(self):
+        return {
+            route: {
+                "requests": stats["wall"].count,
+                "wall_ms": stats["wall"].summary(),
+                "db_ms": stats["db"].summary(),
+                "statements_per_request": round(stats["statements"] / stats["wall"].count, 2),
+                "rows_per_request": round(stats["rows"] / stats["wall"].count, 2),
+            }
+            for route, stats in sorted(self.routes.items())
+        }
+    def clear(self):
+        self.routes.clear()
+
+timings = RouteTimings()
+
+_route_paths = {}
+
+def route_path(scope):
+    """Path template of the matched route, so ids do not explode the label set."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        routes = scope["app"].routes if "app" in scope else ()
+        path = next((route.path for route in routes if getattr(route, "endpoint", None) is endpoint), endpoint.__name__)
+        _route_paths[endpoint] = path
+    return path
+
+class TimingMiddleware:
+    """ASGI middleware timing each HTTP request and adding a `Server-Timing` header."""
+    def __init__(self, app):
+        self.app = app
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.header())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            path = route_path(scope)
+            timings.observe(f"{scope['method']} {path}", timing)
+            observe_request(scope["method"], path, status, timing)
@@ -0,0 +1,53 @@
+"""Monotonic per-table version counters, bumped on every committed write.
+
+The in-process store is only exact with a single worker, CACHE_BACKEND=redis
+keeps the counters in Redis so every worker sees every bump.
+"""
+import uuid
+
+from app.config import Config
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+class MemoryVersions:
+    def __init__(self):
+        # A restarted process must not reuse the ETags of the previous one
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions = {}
+    async def bump(self, *tables):
+        for table in tables:
+            self._versions[table] = self._versions.get(table, 0) + 1
+    async def get(self, tables):
+        return [self.epoch] + [self._versions.get(table, 0) for table in tables]
+
+class RedisVersions:
+    def __init__(self, url):
+        if aioredis is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the `redis` package")
+        self._client = aioredis.from_url(url)
+    async def bump(self, *tables):
+        async with self._client.pipeline(transaction=False) as pipe:
+            for table in tables:
+                pipe.incr(f"version:{table}")
+            await pipe.execute()
+    async def get(self, tables):
+        await self._client.setnx("version:epoch", uuid.uuid4().hex[:8])
+        values = await self._client.mget(["version:epoch"] + [f"version:{table}" for table in tables])
+        return [value.decode() if value else 0 for value in values]
+
+class TableVersions:
+    def __init__(self):
+        self._backend = MemoryVersions()
+    def __getattr__(self, name):
+        return getattr(self._backend, name)
+    def init(self, backend=None):
+        backend = backend or Config.CACHE_BACKEND
+        if backend == "redis":
+            self._backend = RedisVersions(Config.CACHE_URL)
+        else:
+            self._backend = MemoryVersions()
+
+versions = TableVersions()
@@ -0,0 +1,39 @@
+"""Minimal in-process ASGI client, no sockets and no HTTP client dependency."""
+from urllib.parse import urlsplit
+
+async def call(app, method, url, headers=(), body=b""):
+    """Run one request through `app`, returns (status, headers dict, body)."""
+    parts = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench")] + [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    sent = False
+    response = {"status": None, "headers": {}, "body": []}
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], response["headers"], b"".join(response["body"])
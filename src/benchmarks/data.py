@@ -0,0 +1,33 @@
+"""Synthetic dataset shared by the benchmarks.
+
+`seed(rows)` creates the tables and inserts `rows` vehicles, drivers and
+route details, with one fleet per 100 vehicles and one route per 10:
+
+    fleet i     fleet-i      i in 1..rows // 100 + 1
+    route i     route-i      i in 1..rows // 10 + 1
+    driver i    driver-i     i in 1..rows
+    vehicle i   vehicle-i    owner i % fleets + 1
+    detail      (route i % routes + 1, vehicle i, driver i)
+"""
+from sqlalchemy import insert
+
+from app.api.models import Driver, Fleet, Route, RouteDetail, Vehicle
+from app.database import db
+
+def sizes(rows):
+    """(fleets, routes) seeded alongside `rows` vehicles."""
+    return rows // 100 + 1, rows // 10 + 1
+
+async def seed(rows):
+    await db.create_all()
+    async with db.scope() as session:
+        await session.execute(insert(Fleet.__table__), [{"id": i, "name": f"fleet-{i}"} for i in range(1, rows // 100 + 2)])
+        await session.execute(insert(Route.__table__), [{"id": i, "name": f"route-{i}"} for i in range(1, rows // 10 + 2)])
+        await session.execute(insert(Driver.__table__), [{"id": i, "name": f"driver-{i}"} for i in range(1, rows + 1)])
+        await session.execute(insert(Vehicle.__table__), [
+            {"id": i, "name": f"vehicle-{i}", "owner_id": i % (rows // 100 + 1) + 1} for i in range(1, rows + 1)
+        ])
+        await session.execute(insert(RouteDetail.__table__), [
+            {"route_id": i % (rows // 10 + 1) + 1, "vehicle_id": i, "driver_id": i} for i in range(1, rows + 1)
+        ])
+        await session.commit()
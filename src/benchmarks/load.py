@@ -0,0 +1,257 @@
+"""Load test every endpoint of the API in-process.
+
+    python -m benchmarks.load [--scale 10000] [--requests 200] [--concurrency 16]
+                              [--db URL] [--reset] [--cache memory|none] [--change-feed]
+                              [--read-model off|eventual|strict]
+                              [--seed 0] [--output FILE]
+
+Seeds `--scale` vehicles, drivers and route details (see benchmarks.data),
+then drives each route of app.api.views in turn with `--concurrency`
+concurrent clients through the ASGI app, without sockets. For every route
+it reports throughput, p50/p95/p99 latency, status codes and the SQL
+statements per request taken from the Server-Timing header (streamed
+responses such as /export send it before their queries run).
+
+Without `--db` a throwaway SQLite database is used. `--db` takes a
+PostgreSQL URL for an existing database; when that database already has
+rows, `--reset` must be given to delete them first. Request parameters come
+from a random generator seeded with `--seed`, so two runs on different
+commits issue the same requests and their JSON output can be diffed.
+Write routes run last and only touch rows they created.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import subprocess
+import tempfile
+import time
+from collections import Counter
+
+from fastapi.routing import APIRoute
+from sqlalchemy import delete, func, select
+
+from app.api.models import Fleet
+from app.cache import cache
+from app.config import Config
+from app.database import Base, db
+from app.main import app
+from app.readmodel import read_model
+from benchmarks.asgi import call
+from benchmarks.data import seed, sizes
+
+_statements = re.compile(r'desc="(\d+) statements')
+
+# Endpoints that never complete, their cost is per event rather than per request.
+STREAMING = {"GET /stream/changes"}
+
+def percentile(values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+def scenarios(rows):
+    """(route, method, request factory) for every endpoint; factories take (rng, i)."""
+    fleets, routes = sizes(rows)
+    fleet = lambda rng: rng.randint(1, fleets)
+    route = lambda rng: rng.randint(1, routes)
+    row = lambda rng: rng.randint(1, rows)
+    # Rows created by the write routes start above everything seeded.
+    new = rows + 1
+
+    def detail(i):
+        # Seeded details pair vehicle v with route v % routes + 1, shift by one.
+        vehicle = i % rows + 1
+        return (vehicle + 1) % routes + 1, vehicle, vehicle
+
+    def get(url):
+        return lambda rng, i: ("GET", url(rng, i), None)
+
+    def send(method, url, body=None):
+        return lambda rng, i: (method, url(rng, i), json.dumps(body(rng, i)).encode() if body else None)
+
+    def csv(rng, i):
+        # Distinct from the seeded and the created pairs: route shifted by two.
+        vehicles = [(i * 10 + k) % rows + 1 for k in range(10)]
+        lines = [f"{(vehicle + 2) % routes + 1},{vehicle},{vehicle}" for vehicle in vehicles]
+        return "route_id,vehicle_id,driver_id\n" + "\n".join(lines) + "\n"
+
+    reads = [
+        ("GET /fleet/{id}", get(lambda rng, i: f"/fleet/{fleet(rng)}")),
+        ("GET /fleet/", get(lambda rng, i: f"/fleet/?name=fleet-{fleet(rng)}")),
+        ("GET /fleets/", get(lambda rng, i: "/fleets/?limit=100")),
+        ("GET /fleets/search", get(lambda rng, i: f"/fleets/search?q=fleet-{fleet(rng)}")),
+        ("GET /vehicle/{id}", get(lambda rng, i: f"/vehicle/{row(rng)}")),
+        ("GET /vehicle/", get(lambda rng, i: (lambda id: f"/vehicle/?owner_id={id % fleets + 1}&name=vehicle-{id}")(row(rng)))),
+        ("GET /vehicles/", get(lambda rng, i: "/vehicles/?limit=100")),
+        ("GET /vehicles/search", get(lambda rng, i: f"/vehicles/search?q=vehicle-{row(rng)}")),
+        ("GET /driver/{id}", get(lambda rng, i: f"/driver/{row(rng)}")),
+        ("GET /driver/", get(lambda rng, i: f"/driver/?name=driver-{row(rng)}")),
+        ("GET /drivers/", get(lambda rng, i: f"/drivers/?ids={','.join(str(row(rng)) for _ in range(20))}")),
+        ("GET /drivers/search", get(lambda rng, i: f"/drivers/search?q=driver-{row(rng)}")),
+        ("GET /route/{id}", get(lambda rng, i: f"/route/{route(rng)}")),
+        ("GET /route/", get(lambda rng, i: f"/route/?name=route-{route(rng)}")),
+        ("GET /routes/", get(lambda rng, i: "/routes/?limit=100")),
+        ("GET /routes/search", get(lambda rng, i: f"/routes/search?q=route-{route(rng)}")),
+        ("GET /routedetail/{id}", get(lambda rng, i: f"/routedetail/{route(rng)}?expand=vehicle,driver")),
+        ("GET /routedetail/", get(lambda rng, i: f"/routedetail/?route_name=route-{route(rng)}&expand=route")),
+        ("GET /routedetails/", get(lambda rng, i: "/routedetails/?limit=100&expand=route,vehicle,driver")),
+        ("GET /export/{entity}", get(lambda rng, i: f"/export/{rng.choice(['fleets', 'routes'])}?format={rng.choice(['ndjson', 'csv'])}")),
+        ("GET /cache/stats", get(lambda rng, i: "/cache/stats")),
+        ("GET /timing/stats", get(lambda rng, i: "/timing/stats")),
+        ("GET /metrics", get(lambda rng, i: "/metrics")),
+        ("GET /admin/slow-queries", get(lambda rng, i: "/admin/slow-queries")),
+        ("GET /", get(lambda rng, i: "/")),
+        ("GET /healthz", get(lambda rng, i: "/healthz")),
+        ("GET /readyz", get(lambda rng, i: "/readyz")),
+    ]
+    writes = [
+        ("POST /fleet/", send("POST", lambda rng, i: "/fleet/", lambda rng, i: {"id": fleets + new + i, "name": f"load-fleet-{i}"})),
+        ("PUT /fleet/{id}", send("PUT", lambda rng, i: f"/fleet/{fleets + new + i}", lambda rng, i: {"name": f"load-fleet-{i}-v2"})),
+        ("POST /fleet/bulk", send("POST", lambda rng, i: "/fleet/bulk?upsert=true", lambda rng, i: [
+            {"id": fleets + new + i * 10 + k, "name": f"load-fleet-{i}-{k}"} for k in range(10)
+        ])),
+        ("POST /vehicle/", send("POST", lambda rng, i: "/vehicle/", lambda rng, i: {"id": new + i, "name": f"load-vehicle-{i}", "owner_id": fleet(rng)})),
+        ("PUT /vehicle/{id}", send("PUT", lambda rng, i: f"/vehicle/{new + i}", lambda rng, i: {"name": f"load-vehicle-{i}-v2", "owner_id": fleet(rng)})),
+        ("POST /vehicle/bulk", send("POST", lambda rng, i: "/vehicle/bulk?upsert=true", lambda rng, i: [
+            {"id": new + i, "name": f"load-vehicle-{i}-v3", "owner_id": fleet(rng)}
+        ])),
+        ("POST /driver/", send("POST", lambda rng, i: "/driver/", lambda rng, i: {"id": new + i, "name": f"load-driver-{i}"})),
+        ("PUT /driver/{id}", send("PUT", lambda rng, i: f"/driver/{new + i}", lambda rng, i: {"name": f"load-driver-{i}-v2"})),
+        ("POST /driver/bulk", send("POST", lambda rng, i: "/driver/bulk?upsert=true", lambda rng, i: [
+            {"id": new + i, "name": f"load-driver-{i}-v3"}
+        ])),
+        ("POST /route/", send("POST", lambda rng, i: "/route/", lambda rng, i: {"id": routes + new + i, "name": f"load-route-{i}"})),
+        ("PUT /route/{id}", send("PUT", lambda rng, i: f"/route/{routes + new + i}", lambda rng, i: {"name": f"load-route-{i}-v2"})),
+        ("POST /route/bulk", send("POST", lambda rng, i: "/route/bulk?upsert=true", lambda rng, i: [
+            {"id": routes + new + i, "name": f"load-route-{i}-v3"}
+        ])),
+        ("POST /routedetail/", send("POST", lambda rng, i: "/routedetail/", lambda rng, i: dict(
+            zip(("route_id", "vehicle_id", "driver_id"), detail(i))
+        ))),
+        ("POST /routedetail/bulk", send("POST", lambda rng, i: "/routedetail/bulk?upsert=true", lambda rng, i: [
+            dict(zip(("route_id", "vehicle_id", "driver_id"), detail(i)))
+        ])),
+        ("POST /routedetail/import", lambda rng, i: ("POST", "/routedetail/import", csv(rng, i).encode())),
+        ("DELETE /routedetail/", send("DELETE", lambda rng, i: "/routedetail/?route_id={}&vehicle_id={}&driver_id={}".format(*detail(i)))),
+        ("DELETE /route/{id}", send("DELETE", lambda rng, i: f"/route/{routes + new + i}")),
+        ("DELETE /driver/{id}", send("DELETE", lambda rng, i: f"/driver/{new + i}")),
+        ("DELETE /vehicle/{id}", send("DELETE", lambda rng, i: f"/vehicle/{new + i}")),
+        ("DELETE /fleet/{id}", send("DELETE", lambda rng, i: f"/fleet/{fleets + new + i}")),
+    ]
+    return reads + writes
+
+def uncovered(names):
+    routes = {
+        f"{method} {route.path}"
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    return sorted(routes - set(names) - STREAMING)
+
+async def drive(make, requests, concurrency, rng):
+    pending = [make(rng, i) for i in range(requests)]
+    pending.reverse()
+    latencies, statements, statuses = [], [], Counter()
+
+    async def client():
+        while pending:
+            method, url, body = pending.pop()
+            headers = [("content-type", "text/csv" if method == "POST" and url.endswith("/import") else "application/json")]
+            start = time.perf_counter()
+            status, response_headers, _ = await call(app, method, url, headers, body or b"")
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+            timing = _statements.search(response_headers.get("server-timing", ""))
+            if timing:
+                statements.append(int(timing.group(1)))
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall
+    latencies.sort()
+    return {
+        "requests": requests,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "req_per_s": round(requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "statements_per_request": round(sum(statements) / len(statements), 2) if statements else None,
+    }
+
+async def prepare(rows, reset):
+    await db.create_all()
+    async with db.scope() as session:
+        existing = (await session.execute(select(func.count()).select_from(Fleet))).scalar()
+        if existing:
+            if not reset:
+                raise SystemExit("The database already has rows, pass --reset to delete them")
+            for table in reversed(Base.metadata.sorted_tables):
+                await session.execute(delete(table))
+            await session.commit()
+    await seed(rows)
+
+def revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.db or f"sqlite+aiosqlite:///{tmp}/load.db"
+        db.init(url)
+        cache.init(args.cache)
+        # The read model is kept current by the feed
+        Config.CHANGE_FEED = args.change_feed or args.read_model != "off"
+        await prepare(args.scale, args.reset)
+        await read_model.start(args.read_model)
+        rng = random.Random(args.seed)
+        plan = scenarios(args.scale)
+        results = {}
+        for name, make in plan:
+            results[name] = await drive(make, args.requests, args.concurrency, rng)
+        await db.close()
+    return {
+        "meta": {
+            "revision": revision(),
+            "dialect": url.split(":", 1)[0],
+            "scale": args.scale,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cache": args.cache,
+            "change_feed": Config.CHANGE_FEED,
+            "read_model": args.read_model,
+            "seed": args.seed,
+            "uncovered": uncovered(name for name, _ in plan),
+        },
+        "routes": results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--db", help="PostgreSQL URL, a throwaway SQLite database by default")
+    parser.add_argument("--reset", action="store_true", help="delete existing rows in --db first")
+    parser.add_argument("--cache", default="memory", choices=["memory", "none"])
+    parser.add_argument("--change-feed", action="store_true", help="publish every write, implied by --read-model")
+    parser.add_argument("--read-model", default="off", choices=["off", "eventual", "strict"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+    if args.scale < 100:
+        parser.error("--scale must be at least 100")
+    report = json.dumps(asyncio.run(main(args)), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
@@ -0,0 +1,112 @@
+"""Before/after query plans for the name-based lookup paths.
+
+    python -m benchmarks.query_plans [--seed 100000]
+
+Runs everything inside one transaction that is rolled back: optionally seeds
+`--seed` vehicles (with fleets, drivers, routes and route details in
+proportion), EXPLAIN ANALYZEs each lookup with the indexes from migration
+a12919a2122d, then drops them inside a savepoint and explains again.
+Needs a PostgreSQL database migrated to head, DROP INDEX takes an exclusive
+lock until the rollback so do not point it at production.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.future import select
+
+from app.api.models import Driver, Route, RouteDetail, Vehicle
+from app.config import Config
+
+INDEXES = [
+    "ix_vehicles_owner_id_name",
+    "ix_vehicles_name",
+    "ix_drivers_name",
+    "ix_routes_name",
+    "ix_routedetail_vehicle_id",
+    "ix_routedetail_driver_id",
+]
+
+SEED = [
+    "INSERT INTO fleets (id, name) SELECT o + g, 'fleet-' || (o + g) "
+    "FROM generate_series(1, :n / 100 + 1) g, (SELECT coalesce(max(id), 0) o FROM fleets) m",
+    "INSERT INTO drivers (id, name) SELECT o + g, 'driver-' || (o + g) "
+    "FROM generate_series(1, :n) g, (SELECT coalesce(max(id), 0) o FROM drivers) m",
+    "INSERT INTO routes (id, name) SELECT o + g, 'route-' || (o + g) "
+    "FROM generate_series(1, :n / 10 + 1) g, (SELECT coalesce(max(id), 0) o FROM routes) m",
+    "INSERT INTO vehicles (id, name, owner_id) "
+    "SELECT o + g, 'vehicle-' || (o + g), (SELECT max(id) FROM fleets) - g % (:n / 100 + 1) "
+    "FROM generate_series(1, :n) g, (SELECT coalesce(max(id), 0) o FROM vehicles) m",
+    "INSERT INTO routedetail (route_id, vehicle_id, driver_id) "
+    "SELECT (SELECT max(id) FROM routes) - g % (:n / 10 + 1), "
+    "(SELECT max(id) FROM vehicles) - g + 1, (SELECT max(id) FROM drivers) - g + 1 "
+    "FROM generate_series(1, :n) g",
+]
+
+async def sample(conn):
+    vehicle = (await conn.execute(select(Vehicle.id, Vehicle.name, Vehicle.owner_id).limit(1))).one()
+    detail = (await conn.execute(
+        select(Route.name, Driver.name, RouteDetail.driver_id)
+        .join(Route, RouteDetail.route_id == Route.id)
+        .join(Driver, RouteDetail.driver_id == Driver.id)
+        .limit(1)
+    )).one()
+    route_name, driver_name, driver_id = detail
+    return {
+        "Vehicle.filter_both": select(Vehicle).where(Vehicle.owner_id == vehicle.owner_id, Vehicle.name == vehicle.name),
+        "Vehicle.filter_by_name": select(Vehicle).where(Vehicle.name == vehicle.name),
+        "Driver.filter_by_name": select(Driver).where(Driver.name == driver_name),
+        "Route.get_id_by_name": select(Route.id).where(Route.name == route_name),
+        "RouteDetail.get_driver_id": select(RouteDetail).where(RouteDetail.driver_id == driver_id),
+        "RouteDetail.get_vehicle_id": select(RouteDetail).where(RouteDetail.vehicle_id == vehicle.id),
+        "RouteDetail.get_by_name": (
+            select(RouteDetail)
+            .join(Route, RouteDetail.route_id == Route.id)
+            .join(Vehicle, RouteDetail.vehicle_id == Vehicle.id)
+            .join(Driver, RouteDetail.driver_id == Driver.id)
+            .where(Route.name == route_name, Driver.name == driver_name)
+        ),
+    }
+
+async def explain(conn, queries):
+    plans = {}
+    for name, query in queries.items():
+        sql = str(query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+        result = await conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + sql))
+        plans[name] = [row[0] for row in result]
+    return plans
+
+async def main(seed):
+    engine = create_async_engine(Config.DB_CONFIG, future=True)
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            if seed:
+                for statement in SEED:
+                    await conn.execute(text(statement), {"n": seed})
+            await conn.execute(text("ANALYZE fleets, vehicles, drivers, routes, routedetail"))
+            queries = await sample(conn)
+            after = await explain(conn, queries)
+            savepoint = await conn.begin_nested()
+            for name in INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            before = await explain(conn, queries)
+            await savepoint.rollback()
+        finally:
+            await trans.rollback()
+    await engine.dispose()
+
+    for name in queries:
+        print(f"== {name}")
+        print("-- before")
+        print("\n".join(before[name]))
+        print("-- after")
+        print("\n".join(after[name]))
+        print()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="vehicles to generate before explaining")
+    args = parser.parse_args()
+    asyncio.run(main(args.seed))
@@ -0,0 +1,55 @@
+"""Compare the default list serialization with Config.FAST_JSON.
+
+    python -m benchmarks.serialization [--rows 100000] [--limit 1000] [--requests 50]
+
+Seeds a throwaway SQLite database, then pages through /vehicles/ and
+/routedetails/ with FAST_JSON off and on, reporting requests per second
+and CPU microseconds per serialized row for each mode.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from app.cache import cache
+from app.config import Config
+from app.database import db
+from app.main import app
+from benchmarks.asgi import call
+from benchmarks.data import seed
+
+async def run(path, limit, requests):
+    served = 0
+    after = None
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(requests):
+        url = f"{path}?limit={limit}" + (f"&after={after}" if after else "")
+        status, _, body = await call(app, "GET", url)
+        assert status == 200, body
+        page = json.loads(body)
+        served += len(page["items"])
+        after = page["next"]
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {"req_per_s": round(requests / wall, 1), "cpu_us_per_row": round(cpu / max(served, 1) * 1e6, 2)}
+
+async def main(rows, limit, requests):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        cache.init("none")
+        await seed(rows)
+        results = {}
+        for path in ("/vehicles/", "/routedetails/"):
+            for fast in (False, True):
+                Config.FAST_JSON = fast
+                results[f"{path} {'fast' if fast else 'default'}"] = await run(path, limit, requests)
+        await db.close()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit, args.requests))
@@ -0,0 +1,61 @@
+"""Production server: gunicorn supervising uvicorn workers.
+
+    alembic upgrade head && gunicorn app.main:app
+
+gunicorn reads this file from the working directory. The app is imported
+once in the master (`preload_app`) and forked into one worker per
+available CPU (see below); each worker then builds its own engine, cache and version
+clients in `post_fork`, so no socket is ever shared across processes.
+SIGTERM makes every worker stop accepting, finish its in-flight requests
+within `graceful_timeout`, then run the app's shutdown hook, which
+disposes its pool.
+
+Every worker opens up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections, size
+those and WEB_CONCURRENCY together against Postgres' max_connections.
+
+ETag versions and the entity cache only see the writes of their own
+process unless CACHE_BACKEND=redis, so without it one worker is started
+and more than one is refused: another worker would keep answering 304
+for data it never saw change. To use every core, run a Redis server and
+
+    CACHE_BACKEND=redis CACHE_URL=redis://redis:6379/0 gunicorn app.main:app
+"""
+import glob
+import os
+import tempfile
+
+from app.config import Config
+
+# Must be set before the preloaded app imports prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-"))
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+workers = int(os.getenv("WEB_CONCURRENCY", cpus if Config.CACHE_BACKEND == "redis" else 1))
+if workers > 1 and Config.CACHE_BACKEND != "redis":
+    raise RuntimeError(f"WEB_CONCURRENCY={workers} needs CACHE_BACKEND=redis, per-worker versions would serve stale 304s")
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+accesslog = None
+
+def on_starting(server):
+    # Samples left by a previous run would be summed into the new one.
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+def post_fork(server, worker):
+    from app.cache import cache
+    from app.database import db
+    from app.versions import versions
+
+    db.init()
+    cache.init()
+    versions.init()
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
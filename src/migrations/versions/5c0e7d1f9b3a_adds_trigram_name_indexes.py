@@ -0,0 +1,36 @@
+"""adds trigram name indexes
+
+Revision ID: 5c0e7d1f9b3a
+Revises: a12919a2122d
+Create Date: 2026-10-18 11:02:17.228415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c0e7d1f9b3a'
+down_revision = 'a12919a2122d'
+branch_labels = None
+depends_on = None
+
+TABLES = ['fleets', 'vehicles', 'drivers', 'routes']
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f'ix_{table}_name_trgm', table, ['name'], unique=False,
+                postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    # pg_trgm is left installed, other objects may depend on it
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f'ix_{table}_name_trgm', table_name=table, postgresql_concurrently=True)
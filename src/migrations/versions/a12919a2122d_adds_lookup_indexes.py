@@ -0,0 +1,42 @@
+"""adds lookup indexes
+
+Revision ID: a12919a2122d
+Revises: 8ab398b503f4
+Create Date: 2026-10-18 10:12:41.503862
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a12919a2122d'
+down_revision = '8ab398b503f4'
+branch_labels = None
+depends_on = None
+
+# Built with CREATE INDEX CONCURRENTLY so the tables stay writable,
+# which cannot run inside the migration transaction.
+INDEXES = [
+    ('ix_vehicles_owner_id_name', 'vehicles', ['owner_id', 'name']),
+    ('ix_vehicles_name', 'vehicles', ['name']),
+    ('ix_drivers_name', 'drivers', ['name']),
+    ('ix_routes_name', 'routes', ['name']),
+    ('ix_routedetail_vehicle_id', 'routedetail', ['vehicle_id']),
+    ('ix_routedetail_driver_id', 'routedetail', ['driver_id']),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        # fleets.id is the primary key, this index only slows down writes
+        op.drop_index('ix_fleets_id', table_name='fleets', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_fleets_id', 'fleets', ['id'], unique=False, postgresql_concurrently=True)
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -1,9 +1,41 @@
+import asyncio
 import pytest
+from sqlalchemy import event
 from starlette.testclient import TestClient
 
+from app.cache import cache
+from app.config import Config
+from app.database import db
 from app.main import app
 
 @pytest.fixture(scope="module")
 def test_app():
     client = TestClient(app)
-    yield client
\ No newline at end of file
+    yield client
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    db.init(f"sqlite+aiosqlite:///{tmp_path}/test.db")
+    cache.init("memory")
+    asyncio.run(db.create_all())
+    yield db
+    asyncio.run(db.close())
+    db.init(Config.DB_CONFIG)
+
+@pytest.fixture
+def statements(sqlite_db):
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(sqlite_db.engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(sqlite_db.engine.sync_engine, "before_cursor_execute", record)
+
+def seed(*objects):
+    async def _seed():
+        async with db.scope() as session:
+            session.add_all(objects)
+            await session.commit()
+    asyncio.run(_seed())
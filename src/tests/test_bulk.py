@@ -0,0 +1,46 @@
+from app.api.models import Fleet
+from app.config import Config
+from tests.conftest import seed
+
+def test_bulk_create_vehicles(test_app, sqlite_db):
+    seed(Fleet(id=1, name="F"))
+    test_app.post("/vehicle/bulk", json=[{"id": 1, "name": "V1", "owner_id": 1}])
+
+    payload = [
+        {"id": 1, "name": "V1", "owner_id": 1},
+        {"id": 2, "name": "V2", "owner_id": 1},
+        {"id": 3, "name": "V3", "owner_id": 9},
+        {"id": 2, "name": "V2", "owner_id": 1},
+    ]
+    response = test_app.post("/vehicle/bulk", json=payload)
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()] == ["conflict", "created", "fk_missing", "conflict"]
+
+def test_bulk_fleet_name_conflict(test_app, sqlite_db):
+    seed(Fleet(id=1, name="F"))
+    response = test_app.post("/fleet/bulk", json=[{"id": 2, "name": "F"}, {"id": 3, "name": "G"}])
+    assert [r["status"] for r in response.json()] == ["conflict", "created"]
+
+def test_bulk_upsert_routes(test_app, sqlite_db):
+    test_app.post("/route/bulk", json=[{"id": 1, "name": "R1"}])
+    response = test_app.post("/route/bulk?upsert=true", json=[{"id": 1, "name": "R1b"}, {"id": 2, "name": "R2"}])
+    assert [r["status"] for r in response.json()] == ["updated", "created"]
+    assert test_app.get("/route/1").json() == {"id": 1, "name": "R1b"}
+
+def test_bulk_failed_batch_keeps_earlier_batches(test_app, sqlite_db, monkeypatch):
+    seed(Fleet(id=1, name="F"))
+    monkeypatch.setattr(Config, "BULK_BATCH_SIZE", 1)
+    response = test_app.post("/fleet/bulk?upsert=true", json=[
+        {"id": 5, "name": "E"}, {"id": 6, "name": "F"}, {"id": 7, "name": "G"},
+    ])
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()] == ["created", "error", "created"]
+    assert test_app.get("/fleet/5").status_code == 200
+
+def test_bulk_constraint_error_only_fails_its_row(test_app, sqlite_db):
+    seed(Fleet(id=1, name="F"))
+    response = test_app.post("/fleet/bulk?upsert=true", json=[
+        {"id": 1, "name": "F1"}, {"id": 6, "name": "F1"}, {"id": 7, "name": "G"},
+    ])
+    assert [r["status"] for r in response.json()] == ["updated", "error", "created"]
+    assert test_app.get("/fleet/1").json() == {"id": 1, "name": "F1"}
@@ -0,0 +1,63 @@
+import asyncio
+
+from app.api.models import Fleet, Vehicle
+from app.cache import MemoryCache, cache
+from app.database import db
+from app.versions import versions
+from tests.conftest import seed
+
+def test_memory_cache_lru_and_ttl():
+    async def main():
+        lru = MemoryCache(maxsize=2, ttl=60)
+        await lru.set("a", 1)
+        await lru.set("b", 2)
+        await lru.get("a")
+        await lru.set("c", 3)
+        assert await lru.get("b") is None
+        assert await lru.get("a") == 1
+
+        expired = MemoryCache(maxsize=2, ttl=-1)
+        await expired.set("a", 1)
+        assert await expired.get("a") is None
+        return await lru.stats()
+
+    stats = asyncio.run(main())
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+
+def test_get_fleet_is_cached_and_invalidated(test_app, statements):
+    seed(Fleet(id=1, name="A"))
+    statements.clear()
+
+    assert test_app.get("/fleet/1").json() == {"id": 1, "name": "A"}
+    assert test_app.get("/fleet/1").json() == {"id": 1, "name": "A"}
+    assert len(statements) == 1
+
+    test_app.put("/fleet/1", json={"name": "B"})
+    assert test_app.get("/fleet/1").json() == {"id": 1, "name": "B"}
+    assert test_app.get("/fleet/?name=A").status_code == 404
+    assert test_app.get("/fleet/?name=B").json() == {"id": 1, "name": "B"}
+
+def test_fleet_delete_clears_cascaded_vehicles(test_app, sqlite_db):
+    seed(Fleet(id=1, name="A"))
+    seed(Vehicle(id=1, name="V", owner_id=1))
+
+    assert test_app.get("/vehicle/1").status_code == 200
+    assert test_app.delete("/fleet/1").status_code == 200
+    assert test_app.get("/cache/stats").json()["size"] == 0
+
+def test_read_racing_a_write_is_not_cached(sqlite_db, monkeypatch):
+    seed(Fleet(id=1, name="A"))
+    seen = iter([["epoch", 1], ["epoch", 2]])
+
+    async def get(tables):
+        # A write bumps the table between the read's start and its cache fill
+        return next(seen)
+
+    monkeypatch.setattr(versions, "get", get)
+
+    async def main():
+        async with db.scope():
+            row = await Fleet._get(1)
+        return row, await cache.get(Fleet._cache_key("id", 1))
+
+    assert asyncio.run(main()) == ((1, "A"), None)
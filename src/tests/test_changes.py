@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.api.models import Driver, Fleet, Route, RouteDetail, Vehicle
+from app.changes import Subscription, changes
+from app.config import Config
+from app.database import db
+from app.main import app
+from tests.conftest import seed
+
+@pytest.fixture
+def feed(sqlite_db, monkeypatch):
+    monkeypatch.setattr(Config, "CHANGE_FEED", True)
+    return sqlite_db
+
+def test_subscription_filters():
+    vehicle = {"table": "vehicles", "op": "update", "row": {"id": 1, "name": "V", "owner_id": 2}}
+    detail = {"table": "routedetail", "op": "insert", "row": {"route_id": 3, "vehicle_id": 1, "driver_id": None}, "fleet": 2}
+    bulk = {"table": "vehicles", "op": "bulk", "count": 10}
+    assert Subscription().matches(vehicle)
+    assert Subscription(["routedetail"]).matches(detail) and not Subscription(["routedetail"]).matches(vehicle)
+    assert Subscription(fleet=2).matches(vehicle) and not Subscription(fleet=5).matches(vehicle)
+    assert Subscription(fleet=2).matches(detail) and not Subscription(fleet=5).matches(detail)
+    assert Subscription(route=3).matches(detail) and Subscription(fleet=2, route=3).matches(detail)
+    assert Subscription(fleet=5).matches(bulk)
+
+def test_committed_writes_reach_subscribers(feed):
+    seed(Fleet(id=1, name="A"), Fleet(id=2, name="B"))
+
+    async def main():
+        subscription = await changes.subscribe(Subscription(fleet=1))
+        try:
+            async with db.scope():
+                await Vehicle.create(id=1, name="V1", owner_id=1)
+                await Vehicle.create(id=2, name="V2", owner_id=2)
+                await Vehicle.update(1, name="V1b", owner_id=1)
+                await Vehicle.bulk_create([{"id": 3, "name": "V3", "owner_id": 1}])
+            return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+        finally:
+            changes.unsubscribe(subscription)
+
+    frames = asyncio.run(main())
+    events = [json.loads(frame.decode().split("data: ")[1]) for frame in frames]
+    assert events == [
+        {"table": "vehicles", "op": "insert", "row": {"id": 1, "name": "V1", "owner_id": 1}},
+        {"table": "vehicles", "op": "update", "row": {"id": 1, "name": "V1b", "owner_id": 1}},
+        {"table": "vehicles", "op": "bulk", "row": {"id": 3, "name": "V3", "owner_id": 1}},
+    ]
+
+def test_route_details_reach_fleet_subscribers(feed):
+    seed(Fleet(id=1, name="A"), Fleet(id=2, name="B"), Route(id=1, name="R"), Driver(id=1, name="D"))
+    seed(Vehicle(id=1, name="V1", owner_id=1), Vehicle(id=2, name="V2", owner_id=2))
+
+    async def main():
+        subscription = await changes.subscribe(Subscription(["routedetail"], fleet=1))
+        try:
+            async with db.scope():
+                await RouteDetail.create(route_id=1, vehicle_id=1, driver_id=1)
+                await RouteDetail.create(route_id=1, vehicle_id=2, driver_id=1)
+            return [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+        finally:
+            changes.unsubscribe(subscription)
+
+    frames = asyncio.run(main())
+    assert [json.loads(frame.decode().split("data: ")[1]) for frame in frames] == [
+        {"table": "routedetail", "op": "insert", "row": {"route_id": 1, "vehicle_id": 1, "driver_id": 1}, "fleet": 1},
+    ]
+
+def test_stream_endpoint_sends_server_sent_events(feed):
+    seed(Fleet(id=1, name="A"))
+    received = asyncio.Queue()
+
+    async def main():
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            await received.put(message)
+
+        scope = {
+            "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": "/stream/changes", "raw_path": b"/stream/changes", "query_string": b"tables=fleets",
+            "root_path": "", "headers": [(b"host", b"test")], "client": ("127.0.0.1", 0), "server": ("test", 80),
+        }
+        stream = asyncio.ensure_future(app(scope, receive, send))
+        start = await received.get()
+        while not changes.subscriptions:
+            await asyncio.sleep(0)
+        async with db.scope():
+            await Vehicle.create(id=1, name="V1", owner_id=1)
+            await Fleet.update(1, name="B")
+        body = await received.get()
+        stream.cancel()
+        return start, body
+
+    start, body = asyncio.run(main())
+    assert start["status"] == 200
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+    assert body["body"] == b'event: change\ndata: {"table":"fleets","op":"update","row":{"id":1,"name":"B"}}\n\n'
+    assert not changes.subscriptions
+
+def test_feed_off_publishes_nothing(test_app, sqlite_db, monkeypatch):
+    monkeypatch.setattr(Config, "CHANGE_FEED", False)
+    seed(Fleet(id=1, name="A"))
+    test_app.put("/fleet/1", json={"name": "B"})
+    assert test_app.get("/stream/changes").status_code == 404
+
+def test_notify_is_folded_into_the_write():
+    statement = changes.notifying(
+        postgresql.insert(Fleet.__table__).values(id=1, name="A").returning(*Fleet.__table__.columns), "fleets", "insert"
+    )
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("WITH written AS \n(INSERT INTO fleets")
+    assert "pg_notify(" in sql and "row_to_json(written)" in sql
+    assert list(statement.selected_columns.keys()) == ["id", "name", "notified"]
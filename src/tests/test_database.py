@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+
+from app.api.models import Fleet
+from app.database import db
+from tests.conftest import seed
+
+def test_scope_gives_each_task_its_own_session():
+    async def current():
+        async with db.scope() as session:
+            await asyncio.sleep(0)
+            assert db.session is session
+            return session
+
+    async def main():
+        return await asyncio.gather(current(), current())
+
+    first, second = asyncio.run(main())
+    assert first is not second
+
+def test_no_session_outside_scope():
+    with pytest.raises(RuntimeError):
+        db.execute
+
+def test_reads_do_not_fill_the_identity_map(sqlite_db):
+    seed(Fleet(id=1, name="A"), Fleet(id=2, name="B"))
+
+    async def main():
+        async with db.scope() as session:
+            rows, _ = await Fleet.get_page(10)
+            named = await Fleet.filter_by_name("A")
+            return rows, named, len(session.identity_map)
+
+    rows, named, mapped = asyncio.run(main())
+    assert [(row.id, row.name) for row in rows] == [(1, "A"), (2, "B")]
+    assert named[0].name == "A"
+    assert mapped == 0
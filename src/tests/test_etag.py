@@ -0,0 +1,29 @@
+from app.api.models import Fleet
+from tests.conftest import seed
+
+def test_fleets_etag_round_trip(test_app, statements):
+    seed(Fleet(id=1, name="A"))
+
+    response = test_app.get("/fleets/")
+    tag = response.headers["etag"]
+    statements.clear()
+
+    response = test_app.get("/fleets/", headers={"If-None-Match": tag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == tag
+    assert statements == []
+
+    test_app.post("/fleet/", json={"id": 2, "name": "B"})
+    response = test_app.get("/fleets/", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != tag
+    assert len(response.json()["items"]) == 2
+
+def test_etag_depends_on_query(test_app, sqlite_db):
+    first = test_app.get("/fleets/?limit=1").headers["etag"]
+    second = test_app.get("/fleets/?limit=2").headers["etag"]
+    assert first != second
+
+def test_no_etag_on_writes(test_app, sqlite_db):
+    response = test_app.post("/fleet/", json={"id": 1, "name": "A"})
+    assert "etag" not in response.headers
@@ -0,0 +1,33 @@
+from app.api.models import Driver, Fleet, Route, RouteDetail, Vehicle
+from tests.conftest import seed
+
+def seed_details():
+    seed(Fleet(id=1, name="F"), Route(id=1, name="R"), Driver(id=1, name="D"))
+    seed(*[Vehicle(id=i, name=f"V{i}", owner_id=1) for i in range(1, 4)])
+    seed(*[RouteDetail(route_id=1, vehicle_id=i, driver_id=1) for i in range(1, 4)])
+
+def test_routedetails_expand_in_one_query(test_app, statements):
+    seed_details()
+    statements.clear()
+
+    response = test_app.get("/routedetails/?expand=vehicle,driver,route")
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items[0] == {
+        "route_id": 1, "vehicle_id": 1, "driver_id": 1,
+        "route": {"id": 1, "name": "R"},
+        "vehicle": {"id": 1, "name": "V1", "owner_id": 1},
+        "driver": {"id": 1, "name": "D"},
+    }
+    assert [item["vehicle"]["name"] for item in items] == ["V1", "V2", "V3"]
+    assert len(statements) == 1
+
+def test_routedetail_without_expand(test_app, sqlite_db):
+    seed_details()
+    response = test_app.get("/routedetail/1")
+    assert response.json()[0] == {"route_id": 1, "vehicle_id": 1, "driver_id": 1}
+
+    response = test_app.get("/routedetail/?route_name=R&expand=driver")
+    assert response.json()[0] == {"route_id": 1, "vehicle_id": 1, "driver_id": 1, "driver": {"id": 1, "name": "D"}}
+
+    assert test_app.get("/routedetail/1?expand=owner").status_code == 422
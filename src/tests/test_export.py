@@ -0,0 +1,24 @@
+import json
+
+from app.api.models import Fleet, Vehicle
+from tests.conftest import seed
+
+def test_export_ndjson(test_app, sqlite_db):
+    seed(Fleet(id=1, name="F"), *[Vehicle(id=i, name=f"V{i}", owner_id=1) for i in range(1, 4)])
+
+    response = test_app.get("/export/vehicles")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [{"id": i, "name": f"V{i}", "owner_id": 1} for i in range(1, 4)]
+
+def test_export_csv(test_app, sqlite_db):
+    seed(Fleet(id=1, name="F"), Fleet(id=2, name="G"))
+
+    response = test_app.get("/export/fleets?format=csv")
+    assert response.status_code == 200
+    assert response.text.splitlines() == ["id,name", "1,F", "2,G"]
+
+def test_export_unknown_entity(test_app, sqlite_db):
+    response = test_app.get("/export/nothing")
+    assert response.status_code == 404
@@ -0,0 +1,22 @@
+from app.api.models import Driver, Fleet, Route, RouteDetail, Vehicle
+from tests.conftest import seed
+
+def test_filter_statement_joins_only_used_tables():
+    sql = str(RouteDetail._filter_statement(("route_name",), ()))
+    assert "JOIN routes" in sql
+    assert "vehicles" not in sql and "drivers" not in sql
+    assert RouteDetail._filter_statement(("route_name",), ()) is RouteDetail._filter_statement(("route_name",), ())
+
+def test_routedetail_by_name(test_app, sqlite_db):
+    seed(Fleet(id=1, name="F"), Route(id=1, name="R1"), Route(id=2, name="R2"), Driver(id=1, name="D1"), Driver(id=2, name="D2"))
+    seed(Vehicle(id=1, name="V1", owner_id=1), Vehicle(id=2, name="V2", owner_id=1))
+    seed(RouteDetail(route_id=1, vehicle_id=1, driver_id=1), RouteDetail(route_id=1, vehicle_id=2, driver_id=2),
+        RouteDetail(route_id=2, vehicle_id=1, driver_id=2))
+
+    def keys(query):
+        return sorted((d["route_id"], d["vehicle_id"]) for d in test_app.get("/routedetail/?" + query).json())
+
+    assert keys("route_name=R1") == [(1, 1), (1, 2)]
+    assert keys("driver_name=D2") == [(1, 2), (2, 1)]
+    assert keys("route_name=R1&driver_name=D2&vehicle_name=V2") == [(1, 2)]
+    assert keys("vehicle_name=V1&driver_name=D1") == [(1, 1)]
@@ -0,0 +1,32 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+
+from app.database import db
+from app.startup import check_revision, head_revision, readiness, startup
+
+def stamp(revision):
+    async def main():
+        async with db.engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)"))
+            await conn.execute(text("INSERT INTO alembic_version VALUES (:revision)"), {"revision": revision})
+    asyncio.run(main())
+
+def test_healthz_does_not_need_startup(test_app, monkeypatch):
+    monkeypatch.setattr(readiness, "ready", False)
+    assert test_app.get("/healthz").json() == {"status": "ok"}
+    response = test_app.get("/readyz")
+    assert response.status_code == 503
+    assert response.json() == {"status": "starting"}
+
+def test_startup_refuses_an_unmigrated_schema(sqlite_db):
+    with pytest.raises(RuntimeError, match="alembic upgrade head"):
+        asyncio.run(check_revision())
+
+def test_ready_after_startup(test_app, sqlite_db, monkeypatch):
+    monkeypatch.setattr(readiness, "ready", False)
+    stamp(head_revision())
+    asyncio.run(startup())
+    response = test_app.get("/readyz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
@@ -0,0 +1,26 @@
+import asyncio
+import pytest
+
+from app.importer import csv_records
+
+def collect(*chunks):
+    async def source():
+        for chunk in chunks:
+            yield chunk
+
+    async def main():
+        return [record async for record in csv_records(source())]
+
+    return asyncio.run(main())
+
+def test_csv_records_across_chunks():
+    records = collect(b"vehicle_id,route_id,driver_id\n1,", b"2,3\n4,5,\n6,7,8")
+    assert records == [(2, 1, 3), (5, 4, None), (7, 6, 8)]
+
+def test_csv_records_bad_header():
+    with pytest.raises(ValueError):
+        collect(b"route,vehicle\n1,2\n")
+
+def test_csv_records_bad_value():
+    with pytest.raises(ValueError):
+        collect(b"route_id,vehicle_id,driver_id\n1,x,2\n")
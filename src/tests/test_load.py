@@ -0,0 +1,10 @@
+from benchmarks.load import percentile, scenarios, uncovered
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert (percentile(values, 0.5), percentile(values, 0.95), percentile(values, 0.99)) == (50, 95, 99)
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.5) is None
+
+def test_every_route_has_a_scenario():
+    assert uncovered(name for name, _ in scenarios(1000)) == []
@@ -0,0 +1,36 @@
+import asyncio
+
+from app.api.models import Vehicle, Fleet
+from app.database import db
+from app.loader import loader_scope
+from tests.conftest import seed
+
+def test_gets_in_one_tick_are_batched(statements):
+    seed(Fleet(id=1, name="F"))
+    seed(*[Vehicle(id=i, name=f"V{i}", owner_id=1) for i in range(1, 6)])
+    statements.clear()
+
+    async def main():
+        async with db.scope():
+            with loader_scope():
+                return await asyncio.gather(*[Vehicle.get(i) for i in (1, 2, 3, 2, 9)])
+
+    vehicles = asyncio.run(main())
+    assert [v.id if v else None for v in vehicles] == [1, 2, 3, 2, None]
+    assert len(statements) == 1
+
+def test_get_vehicles_by_ids(test_app, statements):
+    seed(Fleet(id=1, name="F"))
+    seed(*[Vehicle(id=i, name=f"V{i}", owner_id=1) for i in range(1, 6)])
+    statements.clear()
+
+    response = test_app.get("/vehicles/?ids=4,2,7,2")
+    assert response.status_code == 200
+    assert [v["id"] for v in response.json()["items"]] == [4, 2]
+    assert len(statements) == 1
+
+    response = test_app.get("/vehicles/?ids=2,3")
+    assert [v["id"] for v in response.json()["items"]] == [2, 3]
+    assert len(statements) == 2
+
+    assert test_app.get("/vehicles/?ids=1,a").status_code == 422
@@ -0,0 +1,47 @@
+import asyncio
+
+from prometheus_client import REGISTRY
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.api.models import Fleet
+from app.metrics import TimedQueuePool, instrument_pool, router_of
+from tests.conftest import seed
+
+def test_router_of():
+    assert router_of("/vehicle/{id}") == "/vehicle"
+    assert router_of("/vehicles/") == "/vehicles"
+    assert router_of("unmatched") == "unmatched"
+
+def test_metrics_exposition(test_app, sqlite_db):
+    seed(Fleet(id=1, name="A"))
+    test_app.get("/fleet/1")
+    test_app.get("/fleet/1")
+    test_app.get("/fleet/2")
+
+    response = test_app.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/fleet/{id}",router="/fleet",status="200"}' in body
+    assert 'http_requests_total{method="GET",route="/fleet/{id}",router="/fleet",status="404"}' in body
+    assert 'http_request_duration_seconds_bucket{le="0.001",method="GET",route="/fleet/{id}",router="/fleet"}' in body
+    assert 'cache_lookups_total{result="hit"}' in body
+    assert "db_pool_wait_seconds_count" in body
+
+def test_pool_gauges_per_engine(tmp_path):
+    engines = {
+        name: create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/{name}.db", poolclass=TimedQueuePool)
+        for name in ("primary", "replica1")
+    }
+    for name, engine in engines.items():
+        instrument_pool(engine.sync_engine, name)
+
+    async def main():
+        async with engines["primary"].connect(), engines["primary"].connect(), engines["replica1"].connect():
+            return [REGISTRY.get_sample_value("db_pool_checked_out", {"engine": name}) for name in engines]
+
+    try:
+        assert asyncio.run(main()) == [2, 1]
+    finally:
+        for engine in engines.values():
+            asyncio.run(engine.dispose())
@@ -0,0 +1,53 @@
+import pytest
+
+from app.api.models import Fleet, Driver, Route, Vehicle, RouteDetail
+from app.api.pagination import encode_cursor
+from app.config import Config
+from tests.conftest import seed
+
+def test_fleets_keyset_pages(test_app, sqlite_db):
+    seed(*[Fleet(id=i, name=f"F{i}") for i in range(1, 6)])
+
+    response = test_app.get("/fleets/?limit=2")
+    assert response.status_code == 200
+    page = response.json()
+    assert [f["id"] for f in page["items"]] == [1, 2]
+
+    ids = [1, 2]
+    while page["next"]:
+        page = test_app.get(f"/fleets/?limit=2&after={page['next']}").json()
+        ids.extend(f["id"] for f in page["items"])
+    assert ids == [1, 2, 3, 4, 5]
+
+def test_routedetails_composite_cursor(test_app, sqlite_db):
+    seed(Fleet(id=1, name="F"), Driver(id=1, name="D"), Route(id=1, name="R1"), Route(id=2, name="R2"),
+        *[Vehicle(id=i, name=f"V{i}", owner_id=1) for i in range(1, 4)])
+    seed(*[RouteDetail(route_id=r, vehicle_id=v, driver_id=1) for r in (1, 2) for v in (1, 2, 3)])
+
+    page = test_app.get("/routedetails/?limit=4").json()
+    keys = [(d["route_id"], d["vehicle_id"]) for d in page["items"]]
+    page = test_app.get(f"/routedetails/?limit=4&after={page['next']}").json()
+    keys += [(d["route_id"], d["vehicle_id"]) for d in page["items"]]
+    assert keys == [(r, v) for r in (1, 2) for v in (1, 2, 3)]
+    assert page["next"] is None
+
+def test_invalid_cursor(test_app, sqlite_db):
+    response = test_app.get("/fleets/?after=not-a-cursor")
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("values", [[[1]], ["x"], [True], [1.5], [None]])
+def test_cursor_value_types(test_app, sqlite_db, values):
+    response = test_app.get(f"/fleets/?after={encode_cursor(values)}")
+    assert response.status_code == 400
+
+def test_fast_json_matches_default(test_app, sqlite_db, monkeypatch):
+    seed(*[Fleet(id=i, name=f"F{i}") for i in range(1, 6)])
+    default = test_app.get("/fleets/?limit=3")
+
+    monkeypatch.setattr(Config, "FAST_JSON", True)
+    fast = test_app.get("/fleets/?limit=3")
+    assert fast.json() == default.json()
+    assert fast.headers["etag"] == default.headers["etag"]
+    assert test_app.get(f"/fleets/?limit=3&after={fast.json()['next']}").json()["items"] == [
+        {"id": 4, "name": "F4"}, {"id": 5, "name": "F5"}
+    ]
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+
+from app.api.models import Driver, Fleet, Route, RouteDetail, Vehicle
+from app.changes import changes
+from app.config import Config
+from app.database import db
+from app.readmodel import Table, read_model
+from tests.conftest import seed
+
+@pytest.fixture
+def graph(sqlite_db, monkeypatch):
+    monkeypatch.setattr(Config, "CHANGE_FEED", True)
+    seed(
+        Fleet(id=1, name="F1"), Fleet(id=2, name="F2"),
+        Route(id=1, name="R1"), Driver(id=1, name="D1"),
+        Vehicle(id=1, name="V1", owner_id=1), Vehicle(id=2, name="V2", owner_id=2),
+        RouteDetail(route_id=1, vehicle_id=1, driver_id=1), RouteDetail(route_id=1, vehicle_id=2, driver_id=1),
+    )
+
+    def start(mode):
+        asyncio.run(read_model.start(mode))
+
+    yield start
+    read_model.stop()
+
+def test_table_keeps_indexes_in_step():
+    table = Table(Vehicle)
+    table.load([Vehicle.record(id=1, name="A", owner_id=1), Vehicle.record(id=2, name="B", owner_id=1)])
+    table.upsert({"id": 1, "name": "C"})
+    assert table.get(1) == Vehicle.record(id=1, name="C", owner_id=1)
+    assert table.where("name", "A") == []
+    assert [row.id for row in table.where("owner_id", 1)] == [1, 2]
+    table.delete({"id": 2})
+    assert [row.id for row in table.where("owner_id", 1)] == [1]
+    assert table.indexes["name"] == {"C": {1}}
+
+def test_reads_answer_from_memory(test_app, graph, statements):
+    urls = ["/vehicle/1", "/vehicle/?owner_id=1&name=V1", "/fleet/?name=F2", "/drivers/?ids=1,5",
+            "/routedetail/?route_name=R1&expand=vehicle,driver", "/routedetail/1?expand=route"]
+    from_sql = [test_app.get(url).json() for url in urls]
+    graph("eventual")
+    statements.clear()
+    assert [test_app.get(url).json() for url in urls] == from_sql
+    assert statements == []
+
+def test_writes_update_the_model_incrementally(test_app, graph, statements):
+    graph("eventual")
+    test_app.put("/fleet/1", json={"name": "F1b"})
+    test_app.post("/vehicle/", json={"id": 3, "name": "V3", "owner_id": 1})
+    statements.clear()
+    assert test_app.get("/fleet/?name=F1b").json() == {"id": 1, "name": "F1b"}
+    assert [v["id"] for v in test_app.get("/vehicle/?owner_id=1").json()] == [1, 3]
+    assert statements == []
+
+    test_app.delete("/routedetail/?route_id=1&vehicle_id=1&driver_id=1")
+    test_app.delete("/routedetail/?route_id=1&vehicle_id=2&driver_id=1")
+    test_app.delete("/fleet/1")
+    assert read_model.where(Vehicle, "owner_id", 1) == []
+    assert test_app.get("/vehicle/3").status_code == 404
+
+def test_bulk_writes_apply_row_by_row(graph):
+    graph("eventual")
+
+    async def main():
+        async with db.scope():
+            await Driver.bulk_create([{"id": 2, "name": "D2"}, {"id": 3, "name": "D3"}])
+            await Driver.bulk_create([{"id": 3, "name": "D3b"}], upsert=True)
+        assert read_model.serves(Driver)
+        return read_model.get(Driver, 2), read_model.get(Driver, 3)
+
+    assert asyncio.run(main()) == (Driver.record(id=2, name="D2"), Driver.record(id=3, name="D3b"))
+
+def test_imports_reload_the_table(graph):
+    graph("eventual")
+    seed(Driver(id=2, name="D2"))
+
+    async def main():
+        changes.dispatch({"table": "drivers", "op": "bulk", "count": 1})
+        assert not read_model.serves(Driver)
+        await read_model.drain()
+        return read_model.get(Driver, 2)
+
+    assert asyncio.run(main()) == Driver.record(id=2, name="D2")
+
+def test_strict_mode_reads_own_writes_from_sql(graph, statements, monkeypatch):
+    graph("strict")
+
+    async def main():
+        async with db.scope():
+            statements.clear()
+            await Fleet.get(2)
+            served = len(statements)
+            await Fleet.update(2, name="F2b")
+            assert (await Fleet.get(2)).name == "F2b"
+            return served, len(statements)
+
+    assert asyncio.run(main()) == (0, 2)
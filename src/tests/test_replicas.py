@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import insert
+
+from app.api.models import Fleet
+from app.cache import cache
+from app.config import Config
+from app.database import Base, db
+from app.readmodel import read_model
+
+@pytest.fixture
+def replicated(tmp_path, monkeypatch):
+    """Primary and two replicas as separate SQLite files, each with its own copy of fleet 1."""
+    urls = [f"sqlite+aiosqlite:///{tmp_path}/{name}.db" for name in ("primary", "replica1", "replica2")]
+    db.init(urls[0], replicas=urls[1:])
+    cache.init("none")
+    monkeypatch.setattr(Config, "DB_REPLICA_STALENESS", 60)
+
+    async def setup():
+        for engine, name in zip([db.engine] + db._replicas, ("primary", "replica1", "replica2")):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(insert(Fleet.__table__), {"id": 1, "name": name})
+
+    asyncio.run(setup())
+    yield db
+    asyncio.run(db.close())
+    db.init(Config.DB_CONFIG)
+
+def test_reads_round_robin_over_replicas(test_app, replicated):
+    names = [test_app.get("/fleet/1").json()["name"] for _ in range(4)]
+    assert names == ["replica1", "replica2", "replica1", "replica2"]
+
+def test_writes_and_reads_after_them_use_the_primary(test_app, replicated):
+    response = test_app.put("/fleet/1", json={"name": "renamed"})
+    assert response.json() == {"id": 1, "name": "renamed"}
+    assert "db_written" in response.cookies
+    assert test_app.get("/fleet/1").json()["name"] == "renamed"
+
+    # Other clients, and this one once the window has passed, read replicas again
+    test_app.cookies.clear()
+    assert test_app.get("/fleet/1").json()["name"] in ("replica1", "replica2")
+    test_app.cookies.set("db_written", str(time.time() - 60))
+    assert test_app.get("/fleet/1").json()["name"] in ("replica1", "replica2")
+    test_app.cookies.clear()
+
+def test_a_write_pins_the_rest_of_the_scope_to_the_primary(replicated):
+    async def main():
+        async with db.scope():
+            before = (await Fleet.get_all())[0].name
+            await Fleet.update(1, name="written")
+            return before, (await Fleet.get_all())[0].name
+
+    assert asyncio.run(main()) == ("replica1", "written")
+
+def test_selects_around_writes_use_the_primary(replicated):
+    statement = Fleet._select().execution_options(writes=True)
+    assert db.bind_for(statement) is db.engine.sync_engine
+    assert db.bind_for(Fleet._select()) is not db.engine.sync_engine
+
+def test_read_model_loads_from_the_primary(replicated, monkeypatch):
+    monkeypatch.setattr(Config, "CHANGE_FEED", True)
+    asyncio.run(read_model.start("eventual"))
+    try:
+        assert read_model.get(Fleet, 1).name == "primary"
+    finally:
+        read_model.stop()
+
+def test_replica_reads_are_not_cached_or_tagged(test_app, replicated):
+    cache.init("memory")
+    test_app.cookies.clear()
+    writer = {"db_written": str(time.time())}
+
+    response = test_app.get("/fleet/1")
+    assert response.json()["name"] in ("replica1", "replica2")
+    assert "etag" not in response.headers
+    assert asyncio.run(cache.get(Fleet._cache_key("id", 1))) is None
+
+    # The writer's reads skip whatever other clients filled and get a tag
+    assert test_app.put("/fleet/1", json={"name": "renamed"}, cookies=writer).status_code == 200
+    test_app.get("/fleet/1")
+    response = test_app.get("/fleet/1", cookies=writer)
+    assert response.json()["name"] == "renamed"
+    assert "etag" in response.headers
+    test_app.cookies.clear()
@@ -0,0 +1,13 @@
+from app.api.models import Driver
+from tests.conftest import seed
+
+def test_search_drivers(test_app, sqlite_db):
+    seed(Driver(id=1, name="Annabel"), Driver(id=2, name="Hannah"), Driver(id=3, name="Bob"), Driver(id=4, name="an_x"))
+
+    response = test_app.get("/drivers/search?q=an")
+    assert response.status_code == 200
+    assert [d["name"] for d in response.json()] == ["Annabel", "an_x", "Hannah"]
+
+    assert [d["id"] for d in test_app.get("/drivers/search?q=an&limit=1").json()] == [1]
+    assert [d["id"] for d in test_app.get("/drivers/search?q=_").json()] == [4]
+    assert test_app.get("/drivers/search").status_code == 422
@@ -0,0 +1,38 @@
+import asyncio
+
+from app.api.models import Driver, Fleet, Route, RouteDetail, Vehicle
+from app.database import db
+from app.singleflight import SingleFlight, flights
+from tests.conftest import seed
+
+def test_concurrent_calls_share_one_task():
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key * 2
+
+    async def main():
+        group = SingleFlight()
+        results = await asyncio.gather(*[group.do("k", load, 21) for _ in range(10)])
+        assert len(group) == 0
+        return results
+
+    assert asyncio.run(main()) == [42] * 10
+    assert calls == [21]
+
+def test_routedetail_by_name_is_coalesced(statements):
+    seed(Fleet(id=1, name="F"), Route(id=1, name="R"), Driver(id=1, name="D"))
+    seed(Vehicle(id=1, name="V", owner_id=1))
+    seed(RouteDetail(route_id=1, vehicle_id=1, driver_id=1))
+    statements.clear()
+
+    async def main():
+        async with db.scope():
+            return await asyncio.gather(*[RouteDetail.get_by_name("R", None, None) for _ in range(20)])
+
+    results = asyncio.run(main())
+    assert all(len(result) == 1 for result in results)
+    assert len(statements) == 1
+    assert len(flights) == 0
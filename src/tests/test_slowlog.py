@@ -0,0 +1,33 @@
+import asyncio
+
+from app.api.models import Fleet, Vehicle
+from app.database import db
+from app.slowlog import normalize, parameters_shape, slow_queries
+from tests.conftest import seed
+
+def test_normalize_and_shape():
+    assert normalize("SELECT id\n  FROM fleets WHERE id IN (?, ?, ?)") == "SELECT id FROM fleets WHERE id IN (?, ...)"
+    assert normalize("WHERE id IN ($1, $2) AND name = $3") == "WHERE id IN ($1, ...) AND name = $3"
+    assert parameters_shape((1, "a")) == ["int", "str"]
+    assert parameters_shape([(1,), (2,)], executemany=True) == "2 x ['int']"
+
+def test_slow_queries_are_logged_with_caller_and_plan(test_app, sqlite_db, monkeypatch):
+    seed(Fleet(id=1, name="A"), Vehicle(id=1, name="V1", owner_id=1))
+    monkeypatch.setattr(slow_queries, "threshold", 0)
+    monkeypatch.setattr(slow_queries, "sample", 1.0)
+    slow_queries.entries.clear()
+
+    async def main():
+        async with db.scope():
+            await Vehicle.filter_both(1, "V1")
+        await slow_queries.drain()
+
+    asyncio.run(main())
+    monkeypatch.setattr(slow_queries, "threshold", 1)
+    entries = test_app.get("/admin/slow-queries").json()
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry["caller"] == "Vehicle.filter_both"
+    assert entry["statement"].startswith("SELECT vehicles.id")
+    assert sorted(entry["parameters"]) == ["int", "str"]
+    assert entry["plan"] and "vehicles" in str(entry["plan"])
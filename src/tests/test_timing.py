@@ -0,0 +1,27 @@
+from app.api.models import Fleet, Vehicle
+from app.timing import Histogram, timings
+from tests.conftest import seed
+
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(1, 10, 100, float("inf")))
+    for value in (0.5, 0.5, 5, 50, 500):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert (histogram.quantile(0.4), histogram.quantile(0.6), histogram.quantile(0.99)) == (1, 10, float("inf"))
+
+def test_server_timing_and_route_stats(test_app, sqlite_db):
+    seed(Fleet(id=1, name="A"), Vehicle(id=1, name="V1", owner_id=1), Vehicle(id=2, name="V2", owner_id=1))
+    timings.clear()
+
+    response = test_app.get("/vehicles/")
+    header = response.headers["server-timing"]
+    assert header.startswith("total;dur=")
+    assert 'db;dur=' in header and '2 rows"' in header
+
+    test_app.get("/vehicle/1")
+    test_app.get("/vehicle/2")
+    stats = test_app.get("/timing/stats").json()
+    assert stats["GET /vehicles/"]["requests"] == 1
+    assert stats["GET /vehicles/"]["rows_per_request"] == 2
+    assert stats["GET /vehicle/{id}"]["requests"] == 2
+    assert stats["GET /vehicle/{id}"]["statements_per_request"] >= 1
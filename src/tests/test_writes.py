@@ -0,0 +1,30 @@
+from app.api.models import Fleet
+from tests.conftest import seed
+
+def test_create_fleet_single_statement(test_app, statements):
+    response = test_app.post("/fleet/", json={"id": 1, "name": "A"})
+    assert response.status_code == 201
+    assert response.json() == {"id": 1, "name": "A"}
+    assert len(statements) == 1
+
+    response = test_app.post("/fleet/", json={"id": 2, "name": "A"})
+    assert response.status_code == 409
+
+def test_update_fleet(test_app, statements):
+    seed(Fleet(id=1, name="A"), Fleet(id=2, name="B"))
+    statements.clear()
+
+    response = test_app.put("/fleet/1", json={"name": "C"})
+    assert response.json() == {"id": 1, "name": "C"}
+    assert len(statements) == 1
+
+    assert test_app.put("/fleet/1", json={"name": "B"}).status_code == 409
+    assert test_app.put("/fleet/9", json={"name": "D"}).status_code == 404
+
+def test_delete_fleet(test_app, statements):
+    seed(Fleet(id=1, name="A"))
+    statements.clear()
+
+    assert test_app.delete("/fleet/1").status_code == 200
+    assert len(statements) == 1
+    assert test_app.delete("/fleet/1").status_code == 404